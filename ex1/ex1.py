@@ -2,49 +2,853 @@
 """
 Exercise 1
 """
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import csv
 from decimal import Decimal
+from functools import lru_cache
+from itertools import combinations, product
+from math import comb, copysign, pi, sqrt
+import json
+import os
+import pickle
+import sys
+from time import perf_counter
 import numpy as np
 from numpy.polynomial import polynomial as ply
+from numpy.polynomial.chebyshev import Chebyshev
 import matplotlib.pyplot as plt
 
+try:
+    import gmpy2
+except ImportError:
+    gmpy2 = None
+
+# integer type for the binary splitting, gmpy2 is much faster for big numbers
+BIG_INT = int if gmpy2 is None else gmpy2.mpz
+# pi/4 = 4 arctan(1/5) - arctan(1/239), as pairs of (coefficient, k)
+MACHIN_IDENTITY = ((4, 5), (-1, 239))
+# the most terms find_arctan_adaptive() uses before it reduces x instead
+MAX_ADAPTIVE_TERMS = 10**7
+
+
+def find_arctan(
+    x: float | np.ndarray,
+    N: int | np.ndarray,
+    threshold: float | None = None,
+    backend: str = "taylor",
+) -> float | np.ndarray:
+    """Calculate the arctan of x using numerical methods. Works on a single
+    value or on a whole array of values at once, with the |x| > 1 branch
+    handled by masking.
+
+    :param x: the value (or array of values) to find arctan of
+    :param N: number of iterations, or an array of them (one per value of x).
+        For the "chebyshev" backend this is the degree of the polynomial in x^2
+    :param threshold: if given, shrink |x| below this before using the series
+    :param backend: "taylor" for the series, "chebyshev" for a fitted polynomial,
+        or "cordic"/"cordic_fixed" for shift-and-add rotations in floats/integers
+    :returns: a float for scalar x, otherwise an array shaped like x
 
-def find_arctan(x: float, N: int) -> float:
-    """Calculate the arctan of x using numerical methods.
+    """
+    if threshold is not None or backend != "taylor":
+        return use_reduced_arctan(x, N, threshold, backend)
+    x_vals = np.asarray(x, dtype=float)
+    is_outside = np.abs(x_vals) > 1
+    if not np.any(is_outside):
+        return sum_to_arctan(x, N)
+    if x_vals.ndim == 0:
+        return use_other_arctan(float(x_vals), N)
+    terms = np.broadcast_to(N, x_vals.shape)
+    answer = np.empty_like(x_vals)
+    answer[~is_outside] = sum_to_arctan(x_vals[~is_outside], terms[~is_outside])
+    answer[is_outside] = use_other_arctan(x_vals[is_outside], terms[is_outside])
+    return answer
+
+
+def find_arctan_adaptive(
+    x: float | np.ndarray, tolerance: float, threshold: float | None = None
+) -> tuple:
+    """Calculate the arctan of x to a given absolute error, using only as
+    many terms of the series as each value of x needs
+
+    :param x: the value (or array of values) to find arctan of
+    :param tolerance: the maximum absolute error allowed
+    :param threshold: if given, shrink |x| below this before using the series.
+        If not, |x| is still shrunk below 0.5 when the series alone would need
+        more than MAX_ADAPTIVE_TERMS terms
+    :returns: the answer and the number of iterations used for it
 
-    :param x: the value to find arctan of
-    :param N: number of iterations
+    """
+    x_vals = np.asarray(x, dtype=float)
+    is_outside = np.abs(x_vals) > 1
+    series_arg = np.divide(1, x_vals, out=x_vals.copy(), where=is_outside)
+    if threshold is None:
+        N = count_arctan_terms(series_arg, tolerance)
+        if np.max(N) <= MAX_ADAPTIVE_TERMS:
+            return find_arctan(x, N), N
+        # near |x| = 1 the series is far too slow, so halve the angle first
+        threshold = 0.5
+    # every halving doubles the error of the series as well
+    series_arg, scale = reduce_arctan_argument(series_arg, threshold)
+    N = count_arctan_terms(series_arg, tolerance / scale)
+    return find_arctan(x, N, threshold), N
+
+
+def reduce_arctan_argument(x: float | np.ndarray, threshold: float) -> tuple:
+    """Shrink x with the half-angle identity
+    arctan(x) = 2 * arctan(x / (1 + sqrt(1 + x^2)))
+    until |x| <= threshold, so the series needs only a few terms
+
+    :param x: the value (or array of values) to reduce
+    :param threshold: the largest |x| to leave alone
+    :returns: the reduced values and the factor to multiply their arctan by
+
+    """
+    if threshold <= 0:
+        raise ValueError("threshold must be positive")
+    if np.ndim(x) == 0:
+        reduced, scale = float(x), 1.0
+        while abs(reduced) > threshold:
+            reduced /= 1 + sqrt(1 + reduced * reduced)
+            scale *= 2
+        return reduced, scale
+    reduced = np.array(x, dtype=float)
+    scale = np.ones_like(reduced)
+    is_large = np.abs(reduced) > threshold
+    while np.any(is_large):
+        large = reduced[is_large]
+        reduced[is_large] = large / (1 + np.sqrt(1 + large * large))
+        scale[is_large] *= 2
+        is_large = np.abs(reduced) > threshold
+    return reduced, scale
+
+
+def count_arctan_terms(x: float | np.ndarray, tolerance: float) -> int | np.ndarray:
+    """Find the smallest N where the first term left out of the series is
+    below the tolerance. The series alternates, so this bounds the error.
+
+    :param x: the value (or array of values) with |x| <= 1
+    :param tolerance: the maximum absolute error allowed, above 0
+    :returns: the number of iterations, shaped like x
+
+    """
+    if not tolerance > 0:
+        raise ValueError("tolerance must be positive")
+    with np.errstate(divide="ignore"):
+        log_x = np.log(np.abs(np.asarray(x, dtype=float)))
+        log_tolerance = np.log(tolerance)
+
+    def is_below_tolerance(num: np.ndarray) -> np.ndarray:
+        power = 2 * num + 3
+        return power * log_x - np.log(power) < log_tolerance
+
+    # either |x|^(2N+3) < tolerance or 1/(2N+3) < tolerance is enough on its own
+    with np.errstate(divide="ignore", invalid="ignore"):
+        power_bound = np.where(log_x < 0, log_tolerance / log_x, np.inf)
+    bound = np.minimum(power_bound, 1 / tolerance)
+    high = np.ceil(np.maximum(bound - 3, 0) / 2).astype(np.int64) + 1
+    low = np.zeros_like(high)
+    while np.any(low < high):
+        mid = (low + high) // 2
+        is_enough = is_below_tolerance(mid)
+        high = np.where(is_enough, mid, high)
+        low = np.where(is_enough, low, mid + 1)
+    return int(high) if high.ndim == 0 else high
+
+
+def sum_to_arctan(x: float | np.ndarray, N: int | np.ndarray) -> float | np.ndarray:
+    """
+    Use Taylor series to expand and find arctan. The series is evaluated
+    with Horner's scheme in x^2, so each term costs one multiply and one add
+    on the whole array instead of recomputing powers of x.
+
+    :param x: the value (or array of values) to find arctan of
+    :param N: number of iterations, or an array of them (one per value of x)
+    :returns: a float for scalar x, otherwise an array shaped like x
+
+    """
+    x_vals = np.asarray(x, dtype=float)
+    if x_vals.ndim == 0:
+        x_sq, running_sum = float(x_vals) ** 2, 0.0
+        for num in range(int(N), -1, -1):
+            running_sum = 1 / (2 * num + 1) - x_sq * running_sum
+        return float(x_vals) * running_sum
+    if np.ndim(N) == 0:
+        x_sq = x_vals * x_vals
+        running_sum = np.zeros_like(x_vals)
+        for num in range(int(N), -1, -1):
+            running_sum = 1 / (2 * num + 1) - x_sq * running_sum
+        return x_vals * running_sum
+    # sort by N so that only the values still needing term num are updated,
+    # which keeps the cost down to the total number of terms
+    terms = np.broadcast_to(N, x_vals.shape).ravel()
+    order = np.argsort(-terms, kind="stable")
+    terms_sorted = terms[order]
+    x_sorted = x_vals.ravel()[order]
+    x_sq = x_sorted * x_sorted
+    running_sum = np.zeros_like(x_sorted)
+    max_terms = int(terms_sorted[0]) if terms.size else -1
+    actives = np.searchsorted(-terms_sorted, -np.arange(max_terms + 1), side="right")
+    for num in range(max_terms, -1, -1):
+        active = actives[num]
+        running_sum[:active] = 1 / (2 * num + 1) - x_sq[:active] * running_sum[:active]
+    answer = np.empty_like(x_sorted)
+    answer[order] = x_sorted * running_sum
+    return answer.reshape(x_vals.shape)
+
+
+def use_other_arctan(x: float | np.ndarray, N: int | np.ndarray) -> float | np.ndarray:
+    """For values of x > |1|, we have to do some arithmetic first
+    and we can also use sum_to_arctan()
+
+    :param x: the value (or array of values) to find arctan of
+    :param N: number of iterations, or an array of them (one per value of x)
 
     """
-    if np.abs(x) <= 1:
+    recip = -sum_to_arctan(1 / np.asarray(x, dtype=float), N)
+    answer = recip + np.sign(x) * np.pi / 2
+    return float(answer) if np.ndim(answer) == 0 else answer
+
+
+def use_reduced_arctan(
+    x: float | np.ndarray,
+    N: int | np.ndarray,
+    threshold: float | None,
+    backend: str = "taylor",
+) -> float | np.ndarray:
+    """Take the reciprocal for |x| > 1 as in use_other_arctan(), then halve the
+    angle until |x| <= threshold before using sum_to_arctan() or another backend
+
+    :param x: the value (or array of values) to find arctan of
+    :param N: number of iterations, or an array of them (one per value of x)
+    :param threshold: the largest |x| to pass to the series, None for 1
+    :param backend: "taylor", "chebyshev", "cordic" or "cordic_fixed"
+
+    """
+    if np.ndim(x) == 0 and np.ndim(N) == 0:
+        # plain floats, as 0-d array masking costs more than the series itself
+        value = float(x)
+        is_outside = abs(value) > 1
+        series_arg, scale = 1 / value if is_outside else value, 1.0
+        if threshold is not None:
+            series_arg, scale = reduce_arctan_argument(series_arg, threshold)
+        answer = scale * sum_reduced_arctan(series_arg, N, threshold, backend)
+        return copysign(pi / 2, value) - answer if is_outside else answer
+    x_vals = np.asarray(x, dtype=float)
+    is_outside = np.abs(x_vals) > 1
+    series_arg = np.divide(1, x_vals, out=x_vals.copy(), where=is_outside)
+    scale = 1.0
+    if threshold is not None:
+        series_arg, scale = reduce_arctan_argument(series_arg, threshold)
+    answer = scale * sum_reduced_arctan(series_arg, N, threshold, backend)
+    return np.where(is_outside, np.sign(x_vals) * np.pi / 2 - answer, answer)
+
+
+def sum_reduced_arctan(
+    x: float | np.ndarray,
+    N: int | np.ndarray,
+    threshold: float | None,
+    backend: str,
+) -> float | np.ndarray:
+    """Pass already reduced values to the chosen arctan backend
+
+    :param x: the value (or array of values) with |x| <= threshold
+    :param N: number of iterations, or an array of them (one per value of x)
+    :param threshold: the largest |x| in x, None for 1
+    :param backend: "taylor", "chebyshev", "cordic" or "cordic_fixed"
+    :returns: a float for scalar x, otherwise an array shaped like x
+
+    """
+    if backend == "taylor":
         return sum_to_arctan(x, N)
-    return use_other_arctan(x, N)
+    if backend == "chebyshev":
+        return sum_to_arctan_chebyshev(x, N, threshold or 1.0)
+    if backend in ("cordic", "cordic_fixed"):
+        return sum_to_arctan_cordic(x, N, backend == "cordic_fixed")
+    raise ValueError(f"Unknown arctan backend {backend}")
 
 
-def sum_to_arctan(x: float, N: int) -> float:
+def sum_to_arctan_chebyshev(
+    x: float | np.ndarray, N: int, interval: float
+) -> float | np.ndarray:
+    """Evaluate arctan(x) as x * p(x^2), where p is a Chebyshev fit of
+    arctan(sqrt(t)) / sqrt(t) of degree N for 0 <= t <= interval^2, summed
+    with the Clenshaw recurrence, which stays accurate for any N.
+
+    :param x: the value (or array of values) with |x| <= interval
+    :param N: the degree of the polynomial
+    :param interval: the largest |x| the fit covers
+    :returns: a float for scalar x, otherwise an array shaped like x
+
     """
-    Use Taylor series to expand and find arctan
+    x_vals = np.asarray(x, dtype=float)
+    coeffs = get_chebyshev_coeffs(int(N), float(interval))
+    # map 0 <= t <= interval^2 onto -1 <= u <= 1, where the fit lives
+    two_u = 4 * x_vals * x_vals / interval**2 - 2
+    running_sum = np.zeros_like(x_vals)
+    previous_sum = np.zeros_like(x_vals)
+    for coeff in coeffs[:0:-1]:
+        next_sum = coeff + two_u * running_sum - previous_sum
+        running_sum, previous_sum = next_sum, running_sum
+    answer = x_vals * (coeffs[0] + two_u / 2 * running_sum - previous_sum)
+    return float(answer) if answer.ndim == 0 else answer
+
+
+@lru_cache(maxsize=None)
+def get_chebyshev_coeffs(
+    N: int, interval: float, cache_dir: str | None = None
+) -> np.ndarray:
+    """Fit arctan(sqrt(t)) / sqrt(t) for 0 <= t <= interval^2 by interpolating
+    at Chebyshev points, which is close to the best (minimax) fit. Kept in
+    memory, and on disk if cache_dir is given.
+
+    :param N: the degree of the polynomial
+    :param interval: the largest |x| the fit covers
+    :param cache_dir: a folder to keep the coefficients in between runs
+    :returns: the Chebyshev coefficients, lowest degree first, for t mapped
+        onto -1 <= u <= 1
 
-    :param x: the value to find arctan of
+    """
+    cache_file = None
+    if cache_dir is not None:
+        cache_file = os.path.join(
+            cache_dir, f"arctan_chebyshev_series_{N}_{interval!r}.npy"
+        )
+        if os.path.exists(cache_file):
+            return np.load(cache_file)
+
+    def arctan_over_x(t: np.ndarray) -> np.ndarray:
+        root_t = np.sqrt(t)
+        return np.arctan(root_t) / root_t
+
+    fit = Chebyshev.interpolate(arctan_over_x, N, domain=[0, interval**2])
+    coeffs = fit.coef
+    if cache_file is not None:
+        np.save(cache_file, coeffs)
+    return coeffs
+
+
+def sum_to_arctan_cordic(
+    x: float | np.ndarray, N: int, is_fixed_point: bool
+) -> float | np.ndarray:
+    """CORDIC in vectoring mode: rotate (1, x) onto the x axis by angles of
+    arctan(2^-i), each done with a shift and an add, and add up the angles.
+    Every value costs N steps and gains about one bit of precision per step,
+    whatever the value of x.
+
+    :param x: the value (or array of values) with |x| <= 1
     :param N: number of iterations
+    :param is_fixed_point: use integers with 60 fractional bits and bit shifts
+    :returns: a float for scalar x, otherwise an array shaped like x
 
     """
-    num = 0
-    running_sum = 0
-    for num in range(N + 1):
-        running_sum += ((-1) ** num) * (x ** (2 * num + 1)) / (2 * num + 1)
-    return running_sum
+    x_vals = np.asarray(x, dtype=float)
+    table = get_cordic_table(int(N))
+    if is_fixed_point:
+        frac_bits = 60
+        x_pos = np.full(x_vals.shape, 1 << frac_bits, dtype=np.int64)
+        y_pos = np.rint(np.ldexp(x_vals, frac_bits)).astype(np.int64)
+        angle = np.zeros(x_vals.shape, dtype=np.int64)
+        table = np.rint(np.ldexp(table, frac_bits)).astype(np.int64)
+    else:
+        x_pos, y_pos, angle = np.ones_like(x_vals), x_vals.copy(), np.zeros_like(x_vals)
+    for num in range(int(N)):
+        if is_fixed_point:
+            # shift |y| rather than y so both directions round the same way
+            direction = 1 - 2 * (y_pos < 0).astype(np.int64)
+            x_shift, y_shift = x_pos >> num, (direction * y_pos) >> num
+            x_pos, y_pos = x_pos + y_shift, y_pos - direction * x_shift
+            angle = angle + direction * table[num]
+        else:
+            # rotate towards the x axis, 2^-num carries the direction with it
+            step = np.copysign(2.0**-num, y_pos)
+            angle = angle + np.copysign(table[num], y_pos)
+            x_pos, y_pos = x_pos + step * y_pos, y_pos - step * x_pos
+    answer = np.ldexp(angle.astype(float), -frac_bits) if is_fixed_point else angle
+    return float(answer) if answer.ndim == 0 else answer
+
+
+@lru_cache(maxsize=None)
+def get_cordic_table(N: int) -> np.ndarray:
+    """Make the table of angles used by sum_to_arctan_cordic()
 
+    :param N: number of iterations
+    :returns: arctan(2^-i) for i from 0 to N - 1
+
+    """
+    return np.arctan(np.ldexp(1.0, -np.arange(N)))
+
+
+def compare_arctan_backends(size: int, N: int, threshold: float | None) -> list:
+    """Time every backend of find_arctan() on the same random values and
+    compare them to np.arctan()
+
+    :param size: the number of values of x
+    :param N: number of iterations (or degree) for every backend
+    :param threshold: passed on to find_arctan()
+    :returns: a list of [backend, max difference, values per second]
+
+    """
+    x_values = np.random.default_rng(0).uniform(-10, 10, size)
+    computer = np.arctan(x_values)
+    results = []
+    for backend in ["taylor", "chebyshev", "cordic", "cordic_fixed"]:
+        # fit any polynomial first so that only the evaluation is timed
+        find_arctan(x_values[:1], N, threshold, backend)
+        start = perf_counter()
+        approx = find_arctan(x_values, N, threshold, backend)
+        duration = perf_counter() - start
+        results.append(
+            [backend, float(np.max(np.abs(approx - computer))), size / duration]
+        )
+    return results
+
+
+def sum_to_arctan_partial(x: float | np.ndarray, N: int) -> np.ndarray:
+    """Find every partial sum of the Taylor series for arctan up to N, with
+    each term made from the previous one
+
+    :param x: the value (or array of values) to find arctan of
+    :param N: number of iterations
+    :returns: array of partial sums, the first axis is the iteration 0..N
+
+    """
+    x_vals = np.asarray(x, dtype=float)
+    num = np.arange(1, N + 1).reshape((-1,) + (1,) * x_vals.ndim)
+    ratios = -(x_vals * x_vals) * (2 * num - 1) / (2 * num + 1)
+    terms = np.concatenate(
+        (x_vals[np.newaxis], x_vals * np.cumprod(ratios, axis=0)), axis=0
+    )
+    return np.cumsum(terms, axis=0)
 
-def use_other_arctan(x: float, N: int) -> float:
-    """For values of x > |1|, we have to do some arithmetic first
-    and we can also use sum_to_arctan()
+
+def find_arctan_sweep(x: float | np.ndarray, N_max: int) -> np.ndarray:
+    """Calculate the arctan of x for every number of iterations from 1 to
+    N_max at once, from the running sum of a single pass over the series
+
+    :param x: the value (or array of values) to find arctan of
+    :param N_max: the largest number of iterations
+    :returns: array where row N - 1 is find_arctan(x, N)
+
+    """
+    x_vals = np.asarray(x, dtype=float)
+    is_outside = np.abs(x_vals) > 1
+    series_arg = np.divide(1, x_vals, out=x_vals.copy(), where=is_outside)
+    partial_sums = sum_to_arctan_partial(series_arg, N_max)[1:]
+    return np.where(
+        is_outside, np.sign(x_vals) * np.pi / 2 - partial_sums, partial_sums
+    )
+
+
+def accelerate_euler(partial_sums: np.ndarray) -> np.ndarray:
+    """Euler transform of an alternating series, done by repeatedly averaging
+    neighbouring partial sums (van Wijngaarden's form)
+
+    :param partial_sums: partial sums along the first axis
+    :returns: the last value of each round of averaging
+
+    """
+    estimates = [partial_sums[-1]]
+    averaged = partial_sums
+    while len(averaged) > 1:
+        averaged = (averaged[1:] + averaged[:-1]) / 2
+        estimates.append(averaged[-1])
+    return np.array(estimates)
+
+
+def accelerate_aitken(partial_sums: np.ndarray) -> np.ndarray:
+    """Repeated Aitken delta-squared process on the partial sums
+
+    :param partial_sums: partial sums along the first axis
+    :returns: the last value of each round of the process
+
+    """
+    estimates = [partial_sums[-1]]
+    sums = partial_sums
+    while len(sums) > 2:
+        step_back, step_fwd = sums[1:-1] - sums[:-2], sums[2:] - sums[1:-1]
+        denominator = step_fwd - step_back
+        with np.errstate(divide="ignore", invalid="ignore"):
+            sums = np.where(
+                denominator != 0, sums[2:] - step_fwd**2 / denominator, sums[2:]
+            )
+        estimates.append(sums[-1])
+    return np.array(estimates)
+
+
+def accelerate_levin(partial_sums: np.ndarray) -> np.ndarray:
+    """Levin t-transform, using each term of the series as the estimate of
+    the remainder after it
+
+    :param partial_sums: partial sums along the first axis
+    :returns: the transform of order 1, 2, ... up to the number of terms
+
+    """
+    terms = np.diff(partial_sums, axis=0, prepend=0)
+    shape = (-1,) + (1,) * (partial_sums.ndim - 1)
+    estimates = [partial_sums[-1]]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        weights = 1 / terms
+        for order in range(1, len(partial_sums)):
+            num = np.arange(order + 1)
+            binomials = np.array([comb(order, val) for val in num], dtype=float)
+            factors = (
+                (-1.0) ** num * binomials * ((1 + num) / (1 + order)) ** (order - 1)
+            ).reshape(shape)
+            numerator = np.sum(
+                factors * partial_sums[: order + 1] * weights[: order + 1], axis=0
+            )
+            denominator = np.sum(factors * weights[: order + 1], axis=0)
+            estimate = numerator / denominator
+            estimates.append(
+                np.where(np.isfinite(estimate), estimate, partial_sums[order])
+            )
+    return np.array(estimates)
+
+
+def accelerate_richardson(partial_sums: np.ndarray) -> np.ndarray:
+    """Richardson extrapolation of the even partial sums, whose error is a
+    smooth function of h = 1/(n + 1), extrapolated to h = 0
+
+    :param partial_sums: partial sums along the first axis
+    :returns: the last value of each column of the extrapolation table
+
+    """
+    even_sums = partial_sums[::2]
+    shape = (-1,) + (1,) * (partial_sums.ndim - 1)
+    steps = (1 / (2 * np.arange(len(even_sums)) + 1)).reshape(shape)
+    estimates = [partial_sums[-1]]
+    column = even_sums
+    for level in range(1, len(even_sums)):
+        # Neville's scheme evaluated at a step size of zero
+        column = (steps[:-level] * column[1:] - steps[level:] * column[:-1]) / (
+            steps[:-level] - steps[level:]
+        )
+        estimates.append(column[-1])
+    return np.array(estimates)
+
+
+def pick_converged_estimate(estimates: np.ndarray) -> tuple:
+    """Pick the estimate that changed the least from the one before it,
+    which is the best guess at where the sequence has converged
+
+    :param estimates: sequence of estimates along the first axis
+    :returns: the chosen estimate and the change, as an error estimate
+
+    """
+    if len(estimates) < 2:
+        return estimates[-1], np.full_like(estimates[-1], np.inf)
+    changes = np.abs(np.diff(estimates, axis=0))
+    changes = np.where(np.isnan(changes), np.inf, changes)
+    best = np.argmin(changes, axis=0)[np.newaxis]
+    return (
+        np.take_along_axis(estimates[1:], best, axis=0)[0],
+        np.take_along_axis(changes, best, axis=0)[0],
+    )
+
+
+def find_arctan_accelerated(
+    x: float | np.ndarray, N: int, method: str = "auto"
+) -> tuple:
+    """Calculate the arctan of x from N iterations of the series, sped up by
+    a sequence transformation of its partial sums
+
+    :param x: the value (or array of values) to find arctan of
+    :param N: number of iterations
+    :param method: one of ACCELERATIONS, or "auto" to take whichever
+        transformation looks best converged for each value
+    :returns: the answer and the name of the transformation used for it
+
+    """
+    if method != "auto" and method not in ACCELERATIONS:
+        raise ValueError(f"Unknown method {method}")
+    x_vals = np.asarray(x, dtype=float)
+    is_outside = np.abs(x_vals) > 1
+    series_arg = np.divide(1, x_vals, out=x_vals.copy(), where=is_outside)
+    partial_sums = sum_to_arctan_partial(series_arg, N)
+    names = list(ACCELERATIONS) if method == "auto" else [method]
+    answers, errors = zip(
+        *(pick_converged_estimate(ACCELERATIONS[name](partial_sums)) for name in names)
+    )
+    best = np.argmin(np.array(errors), axis=0)
+    answer = np.choose(best, answers)
+    answer = np.where(is_outside, np.sign(x_vals) * np.pi / 2 - answer, answer)
+    used = np.array(names)[best]
+    if answer.ndim == 0:
+        return float(answer), str(used)
+    return answer, used
+
+
+def compare_accelerations(x: float, N: int) -> list:
+    """Time each transformation on the same N iterations for arctan(x)
 
     :param x: the value to find arctan of
     :param N: number of iterations
+    :returns: a list of [method, answer, seconds] for each transformation
+
+    """
+    results = []
+    for name in ["none", *ACCELERATIONS]:
+        start = perf_counter()
+        if name == "none":
+            answer = find_arctan(x, N)
+        else:
+            answer, _ = find_arctan_accelerated(x, N, name)
+        results.append([name, answer, perf_counter() - start])
+    return results
+
+
+ACCELERATIONS = {
+    "euler": accelerate_euler,
+    "aitken": accelerate_aitken,
+    "levin": accelerate_levin,
+    "richardson": accelerate_richardson,
+}
+
+
+def split_arctan_recip(k: int, start: int, stop: int) -> tuple:
+    """Binary splitting of the terms start..stop-1 of the series for
+    arctan(1/k) * k = sum (-1)^n / ((2n + 1) k^(2n)), using integers only
+
+    :param k: the integer in arctan(1/k)
+    :param start: first term
+    :param stop: one past the last term
+    :returns: tuple of integers (P, Q, T), where the sum of the terms is
+        T / Q and P is the product of the numerators, to join on more terms
+
+    """
+    if stop - start == 1:
+        if start == 0:
+            return BIG_INT(1), BIG_INT(1), BIG_INT(1)
+        numerator = BIG_INT(-(2 * start - 1))
+        return numerator, BIG_INT((2 * start + 1) * k * k), numerator
+    mid = (start + stop) // 2
+    return join_arctan_splits(
+        split_arctan_recip(k, start, mid), split_arctan_recip(k, mid, stop)
+    )
+
+
+def join_arctan_splits(first: tuple, second: tuple) -> tuple:
+    """Join the (P, Q, T) of two neighbouring ranges of terms
+
+    :param first: (P, Q, T) of the earlier terms
+    :param second: (P, Q, T) of the terms straight after
+    :returns: (P, Q, T) of both ranges together
+
+    """
+    p_1, q_1, t_1 = first
+    p_2, q_2, t_2 = second
+    return p_1 * p_2, q_1 * q_2, t_1 * q_2 + p_1 * t_2
+
+
+def find_pi_machin(
+    digits: int, identity: tuple = MACHIN_IDENTITY, checkpoint: str | None = None
+) -> str:
+    """Calculate pi to many decimal places from an identity
+    pi/4 = sum c * arctan(1/k), with each arctan found by binary splitting
+
+    :param digits: the number of decimal places
+    :param identity: tuple of (c, k) pairs
+    :param checkpoint: a file to keep the (P, Q, T) of each arctan in, so
+        a later run needing more terms carries on from there
+    :returns: pi as a string of digits
+
+    """
+    guard = 10
+    splits = load_arctan_checkpoint(checkpoint)
+    scale = BIG_INT(10) ** (digits + guard)
+    pi_scaled = BIG_INT(0)
+    for coeff, k in identity:
+        # every term is at least k^2 smaller than the one before it
+        terms = int(np.ceil((digits + guard) / (2 * np.log10(k)))) + 1
+        done = splits.get(k, (0, None))
+        if done[0] == 0:
+            splits[k] = (terms, split_arctan_recip(k, 0, terms))
+        elif done[0] < terms:
+            splits[k] = (
+                terms,
+                join_arctan_splits(done[1], split_arctan_recip(k, done[0], terms)),
+            )
+        _, denominator, numerator = splits[k][1]
+        pi_scaled += 4 * coeff * numerator * scale // (denominator * k)
+    save_arctan_checkpoint(checkpoint, splits)
+    pi_digits = format_big_int(pi_scaled // BIG_INT(10) ** guard)
+    return pi_digits[0] + "." + pi_digits[1:]
+
+
+def load_arctan_checkpoint(checkpoint: str | None) -> dict:
+    """Read the (P, Q, T) saved by an earlier run of find_pi_machin()
+
+    :param checkpoint: the file name, or None
+    :returns: dict of k: (terms, (P, Q, T)), empty if there is no file
 
     """
-    recip = -sum_to_arctan(1 / x, N)
-    return (recip + np.pi / 2) if x > 0 else (recip - np.pi / 2)
+    if checkpoint is None or not os.path.exists(checkpoint):
+        return {}
+    with open(checkpoint, "rb") as file:
+        splits = pickle.load(file)
+    return {
+        k: (terms, tuple(BIG_INT(val) for val in split))
+        for k, (terms, split) in splits.items()
+    }
+
+
+def save_arctan_checkpoint(checkpoint: str | None, splits: dict):
+    """Save the (P, Q, T) of each arctan for a later run of find_pi_machin()
+
+    :param checkpoint: the file name, or None to skip saving
+    :param splits: dict of k: (terms, (P, Q, T))
+
+    """
+    if checkpoint is None:
+        return
+    # plain ints so the file can be read back with or without gmpy2
+    splits = {
+        k: (terms, tuple(int(val) for val in split))
+        for k, (terms, split) in splits.items()
+    }
+    with open(checkpoint + ".tmp", "wb") as file:
+        pickle.dump(splits, file, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(checkpoint + ".tmp", checkpoint)
+
+
+def format_big_int(value: int) -> str:
+    """Convert a (possibly huge) integer to a string of digits
+
+    :param value: the integer
+    :returns: its decimal digits
+
+    """
+    if gmpy2 is not None:
+        return gmpy2.mpz(value).digits(10)
+    if hasattr(sys, "set_int_max_str_digits"):
+        sys.set_int_max_str_digits(0)
+    return str(value)
+
+
+def check_machin_identity(identity: tuple) -> bool:
+    """Check exactly that pi/4 = sum c * arctan(1/k), using the argument of
+    the Gaussian integer product of (k + i)^c
+
+    :param identity: tuple of (c, k) pairs
+    :returns: True if the identity holds
+
+    """
+    real, imag = 1, 0
+    for coeff, k in identity:
+        # (k - i) is the conjugate, which takes the angle away instead
+        sign = 1 if coeff > 0 else -1
+        for _ in range(abs(coeff)):
+            real, imag = real * k - sign * imag, imag * k + sign * real
+    # the angle is pi/4 only when both parts are equal and positive, but that
+    # also allows pi/4 + 2 pi m, so check roughly with floats as well
+    angle = sum(coeff * np.arctan(1 / k) for coeff, k in identity)
+    return real == imag and real > 0 and abs(angle - np.pi / 4) < 1
+
+
+def search_machin_identities(
+    max_k: int, max_coeff: int, max_terms: int, max_prime: int = 13
+) -> list:
+    """Find identities pi/4 = sum c * arctan(1/k). Only k where k^2 + 1 has
+    small prime factors can take part (Stormer), so the rest are skipped.
+
+    :param max_k: largest k to try
+    :param max_coeff: largest |c| to try
+    :param max_terms: largest number of arctans in an identity
+    :param max_prime: largest prime factor allowed in k^2 + 1
+    :returns: a list of identities, as tuples of (c, k) pairs
+
+    """
+    candidates = [k for k in range(2, max_k + 1) if is_smooth(k * k + 1, max_prime)]
+    coeffs = [val for val in range(-max_coeff, max_coeff + 1) if val != 0]
+    identities = []
+    for num_terms in range(1, max_terms + 1):
+        new_identities = []
+        for ks in combinations(candidates, num_terms):
+            angles = [np.arctan(1 / k) for k in ks]
+            for first_coeffs in product(coeffs, repeat=num_terms - 1):
+                # the last coefficient is fixed by the others
+                remainder = np.pi / 4 - np.dot(first_coeffs, angles[:-1])
+                last_coeff = int(np.rint(remainder / angles[-1]))
+                if last_coeff == 0 or abs(last_coeff) > max_coeff:
+                    continue
+                identity = tuple(zip((*first_coeffs, last_coeff), ks))
+                # anything containing a shorter identity only adds a relation
+                # between the arctans that does not help
+                if check_machin_identity(identity) and not any(
+                    {k for _, k in found} <= set(ks) for found in identities
+                ):
+                    new_identities.append(identity)
+        identities += new_identities
+    return identities
+
+
+def is_smooth(value: int, max_prime: int) -> bool:
+    """Check if value has no prime factor above max_prime
+
+    :param value: a positive integer
+    :param max_prime: largest prime factor allowed
+    :returns: True if value is max_prime-smooth
+
+    """
+    for factor in range(2, max_prime + 1):
+        while value % factor == 0:
+            value //= factor
+    return value == 1
+
+
+def benchmark_machin_identities(
+    identities: list, digits: int, repeats: int = 5
+) -> list:
+    """Time how long each identity takes to give pi to a number of digits,
+    with find_arctan() for up to 15 digits and find_pi_machin() beyond that
+
+    :param identities: a list of identities, as tuples of (c, k) pairs
+    :param digits: the number of decimal places wanted
+    :param repeats: the number of runs to take the fastest time from
+    :returns: a list of [identity, terms per digit, terms, seconds, error]
+        sorted by terms per digit, with the time only breaking ties, as a
+        few microseconds of timing is mostly noise
+
+    """
+    results = []
+    for identity in identities:
+        # arctan(1/k) gains 2 log10(k) digits with every term
+        terms_per_digit = sum(1 / (2 * np.log10(k)) for _, k in identity)
+        if digits <= 15:
+            terms = [count_arctan_terms(1 / k, 10.0**-digits / 8) for _, k in identity]
+        else:
+            terms = [int(np.ceil(digits / (2 * np.log10(k)))) for _, k in identity]
+        seconds = np.inf
+        for _ in range(repeats):
+            start = perf_counter()
+            if digits <= 15:
+                calc_pi = 4 * sum(
+                    coeff * find_arctan(1 / k, N)
+                    for (coeff, k), N in zip(identity, terms)
+                )
+            else:
+                calc_pi = float(find_pi_machin(digits, identity)[:17])
+            seconds = min(seconds, perf_counter() - start)
+        results.append(
+            [identity, terms_per_digit, sum(terms), seconds, abs(calc_pi - np.pi)]
+        )
+    return sorted(results, key=lambda row: (row[1], row[3]))
+
+
+def format_machin_identity(identity: tuple) -> str:
+    """Write an identity out as text
+
+    :param identity: tuple of (c, k) pairs
+    :returns: a string like "4[5] - 1[239]", where c[k] is c * arctan(1/k)
+
+    """
+    text = ""
+    for coeff, k in identity:
+        sign = "-" if coeff < 0 else "+"
+        text += f" {sign} {abs(coeff)}[{k}]"
+    return text.lstrip(" +")
 
 
 def generate_values() -> np.ndarray:
@@ -65,45 +869,110 @@ def generate_table(N: int, is_print: bool) -> float:
 
     """
     x_values = generate_values()
-    approx = np.zeros(len(x_values))
-    computer = np.zeros(len(x_values))
-    diff = np.zeros(len(x_values))
-    for idx, val in enumerate(x_values):
-        approx[idx], computer[idx] = find_arctan(val, N), np.arctan(val)
-        diff[idx] = np.abs(approx[idx] - computer[idx])
+    approx, computer = find_arctan(x_values, N), np.arctan(x_values)
+    diff = np.abs(approx - computer)
     if is_print:
-        padding = "│".ljust(4)
-        draw_boxes("top", 3, 19)
-        print(
-            padding
-            + "Value (2dp)".ljust(16)
-            + padding
-            + "Approx (6dp)".ljust(16)
-            + padding
-            + "Built-in (6dp)".ljust(16)
-            + padding
-            + "Diff (6dp)".ljust(16)
-            + padding
-        )
-        draw_boxes("mid", 3, 19)
-        for idx, val in enumerate(x_values):
-            print(
-                padding
-                + f"{round_with_decimal(2, val)}".ljust(16)
-                + padding
-                + f"{round_with_decimal(6, approx[idx])}".ljust(16)
-                + padding
-                + f"{round_with_decimal(6, computer[idx])}".ljust(16)
-                + padding
-                + f"{round_with_decimal(6, diff[idx])}".ljust(16)
-                + padding,
-            )
-        draw_boxes("bot", 3, 19)
+        print_arctan_table(x_values, approx, computer, diff)
     return float(
         np.mean(diff)
     )  # most of the errors not at |x| = 1 are roughly zero anyway
 
 
+def generate_table_sweep(N_max: int, is_print: bool) -> np.ndarray:
+    """Do generate_table() for every N from 1 to N_max, with the series
+    summed once up to N_max instead of once per N
+
+    :param N_max: the largest number of iterations
+    :param is_print: toggles printing a table for each N
+    :returns: the average difference for each N
+
+    """
+    x_values = generate_values()
+    approx, computer = find_arctan_sweep(x_values, N_max), np.arctan(x_values)
+    diff = np.abs(approx - computer)
+    if is_print:
+        for num in range(1, N_max + 1):
+            print(f"For {num} iterations")
+            print_arctan_table(x_values, approx[num - 1], computer, diff[num - 1])
+    return np.mean(diff, axis=1)
+
+
+def print_arctan_table(
+    x_values: np.ndarray,
+    approx: np.ndarray,
+    computer: np.ndarray,
+    diff: np.ndarray,
+    style: str = "box",
+    file=None,
+):
+    """Print a table of the approximated and built-in arctan of x_values
+
+    :param x_values: the values of x
+    :param approx: the approximated arctan
+    :param computer: the built-in arctan
+    :param diff: the difference between them
+    :param style: "box", "csv" or "tsv", as in write_table()
+    :param file: where to write the table, the terminal if None
+
+    """
+    write_table(
+        ["Value (2dp)", "Approx (6dp)", "Built-in (6dp)", "Diff (6dp)"],
+        [x_values, approx, computer, diff],
+        [".2f", ".6f", ".6f", ".6f"],
+        16,
+        style,
+        file,
+    )
+
+
+def write_table(
+    headers: list,
+    columns: list,
+    formats: list,
+    width: int = 16,
+    style: str = "box",
+    file=None,
+):
+    """Write a table a whole column at a time, rounding each column with numpy
+    and formatting every row from one template, then writing it all at once
+
+    :param headers: the title of each column
+    :param columns: the values of each column, all of the same length
+    :param formats: the format spec of each column, e.g. ".6f" or "d", or ""
+        for values that are already strings
+    :param width: the width of each column for "box"
+    :param style: "box" for a table drawn with draw_boxes(), "csv" or "tsv"
+    :param file: where to write the table, the terminal if None
+
+    """
+    cells = []
+    for column, spec in zip(columns, formats):
+        column = np.asarray(column)
+        if spec.endswith("f"):
+            # + 0.0 so values that round to -0 print without the sign
+            column = np.round(column.astype(float), int(spec[1:-1])) + 0.0
+        cells.append(column.tolist())
+    if style == "box":
+        padding = "│".ljust(4)
+        row_format = (
+            padding + padding.join(f"{{:<{width}{spec}}}" for spec in formats) + padding
+        )
+        lines = [
+            draw_boxes("top", len(headers) - 1, width + 3),
+            padding + padding.join(title.ljust(width) for title in headers) + padding,
+            draw_boxes("mid", len(headers) - 1, width + 3),
+            *map(row_format.format, *cells),
+            draw_boxes("bot", len(headers) - 1, width + 3),
+        ]
+    elif style in ("csv", "tsv"):
+        delimiter = "," if style == "csv" else "\t"
+        row_format = delimiter.join(f"{{:{spec}}}" for spec in formats)
+        lines = [delimiter.join(headers), *map(row_format.format, *cells)]
+    else:
+        raise ValueError(f"Unknown table style {style}")
+    (sys.stdout if file is None else file).write("\n".join(lines) + "\n")
+
+
 def take_input_n() -> int:
     """Take in N as an input with error catching
 
@@ -121,6 +990,24 @@ def take_input_n() -> int:
     return N
 
 
+def take_input_int(var_name: str) -> int:
+    """Take in a value as an input with error catching These should be positive integers
+
+    :param var_name: a string name for variable
+    :returns: the inputted variable
+
+    """
+    input_var = input(f"Enter a value for {var_name} (positive integer): ")
+    while True:
+        try:
+            var = int(input_var)
+            assert var > 0
+            break
+        except Exception:
+            input_var = input(f"Please enter a positive integer for {var_name}: ")
+    return var
+
+
 def take_input_complex(var_name: str) -> complex:
     """Take in a value as an input with error catching These should be complex
     :param var_name: a string name for variable
@@ -171,7 +1058,6 @@ def run_option_b():
     _ = input("Press anything to continue...")
     N = take_input_n()
     _ = generate_table(N, True)
-    diffs = np.zeros(20)
     print("Testing the precision for N from 1 to 20.")
     user_input = input(
         "Do you want to print a table of results each time? (y/N): ",
@@ -179,30 +1065,13 @@ def run_option_b():
     while user_input not in ["y", "n", ""]:
         user_input = input("Unknown option. Try again:")
     _ = input("Press anything to continue...")
-    for num in range(1, 21):
-        if user_input == "y":
-            print(f"For {num} iterations")
-        diffs[num - 1] = generate_table(num, user_input == "y")
+    diffs = generate_table_sweep(20, user_input == "y")
     print("\nSummary for iterations and average difference around x = 1:")
-    padding = "│".ljust(4)
-    draw_boxes("top", 1, 19)
-    print(
-        padding
-        + "Iterations".ljust(16)
-        + padding
-        + "Avg diff (6dp)".ljust(16)
-        + padding
-    )
-    draw_boxes("mid", 1, 19)
-    for idx, val in enumerate(diffs):
-        print(
-            padding
-            + str(idx + 1).ljust(16)
-            + padding
-            + str(round_with_sigfigs(6, val)).ljust(16)
-            + padding
-        )
-    draw_boxes("bot", 1, 19)
+    write_table(
+        ["Iterations", "Avg diff (6dp)"],
+        [np.arange(1, len(diffs) + 1), diffs],
+        ["d", ".6g"],
+    )
     _ = input("Now plotting a graph of this. Press anything to continue...")
     plt.scatter(list(map(str, list(range(1, 21)))), diffs)
     plt.xlabel("Number of iterations")
@@ -213,11 +1082,15 @@ def run_option_b():
 def run_option_c():
     """Run option c"""
     print(
-        "Estimating pi = arctan(1)/4. 742718 iterations needed for 7 significant figures."
+        "Estimating pi = 4 * arctan(1), stopping once the error is below a tolerance.",
+        "\nA tolerance of 5e-7 gives 7 significant figures.",
     )
-    _ = input("Press anything to continue...")
-    N = 742718  # I just kept adjusting until I got the desired difference
-    calc_pi = 4 * find_arctan(1, N)
+    tolerance = take_input_general("the tolerance")
+    while tolerance <= 0:
+        tolerance = take_input_general("the tolerance (above 0)")
+    # the error on pi is four times the error on arctan(1)
+    arctan_one, N = find_arctan_adaptive(1, tolerance / 4)
+    calc_pi = 4 * arctan_one
     diff = abs(np.pi - calc_pi)
     print(
         f"The answer with N = {N}\nApproximated value = {calc_pi}",
@@ -268,12 +1141,13 @@ def run_option_e():
     )
 
 
-def draw_boxes(location: str, repeats: int, width: int):
+def draw_boxes(location: str, repeats: int, width: int) -> str:
     """Draw boxes using ascii characters
 
     :param location: top, mid or bot
-    :param repeats: how many columns
+    :param repeats: how many columns, less one
     :param width: the width of each column
+    :returns: the line of the boxes
 
     """
     line, characters = "─", []
@@ -283,7 +1157,7 @@ def draw_boxes(location: str, repeats: int, width: int):
         characters = ["├", "┼", "┤"]
     elif location == "bot":
         characters = ["└", "┴", "┘"]
-    print(
+    return (
         characters[0]
         + (line * width + characters[1]) * repeats
         + line * width
@@ -291,49 +1165,259 @@ def draw_boxes(location: str, repeats: int, width: int):
     )
 
 
-def format_many_roots(answers: list):
+def format_many_roots(answers: list, variables: list = None):
     """Print table for multiple roots finding method
 
     :param answers: a list of answers
+    :param variables: a list of coefficients, to give the multiplicity of
+        each distinct root in the summary
 
     """
-    padding = "│".ljust(4)
-    draw_boxes("top", 2, 35)
-    print(
-        padding
-        + "Initial guess".ljust(32)
-        + padding
-        + "Root found (9 dp)".ljust(32)
-        + padding
-        + "No. of iteration".ljust(32)
-        + padding
-    )
-    draw_boxes("mid", 2, 35)
-    roots = []
-    for line in answers:
-        if line[1] is None:
-            continue
-        # round and collect all roots found
-        val = complex(line[1])
-        val_real = round_with_sigfigs(6, round_with_decimal(7, np.real(val)))
-        val_imag = round_with_sigfigs(6, round_with_decimal(7, np.imag(val)))
-        roots.append(complex(val_real, val_imag))
-        # round table values for printing
-        line[0] = complex(
-            round_with_decimal(3, np.real(line[0])),
-            round_with_decimal(3, np.imag(line[0])),
+    answers = [line for line in answers if line[1] is not None]
+    seeds = np.round(np.array([line[0] for line in answers], dtype=complex), 3)
+    roots = np.array([line[1] for line in answers], dtype=complex)
+    write_table(
+        ["Initial guess", "Root found (9 dp)", "No. of iteration"],
+        [
+            [str(seed + 0).strip("()") for seed in seeds.tolist()],
+            [str(root + 0).strip("()") for root in np.round(roots, 9).tolist()],
+            [line[2] for line in answers],
+        ],
+        ["", "", "d"],
+        32,
+    )
+    # merge the roots that are the same to within the accuracy of the search
+    centres, _, counts = cluster_roots(roots)
+    print("\nSummary of roots found, to 6 significant figures")
+    for centre, count in zip(centres, counts):
+        summary = str(
+            complex(
+                round_with_sigfigs(6, round_with_decimal(7, np.real(centre))),
+                round_with_sigfigs(6, round_with_decimal(7, np.imag(centre))),
+            )
+        )
+        if variables is not None:
+            summary += f"\tmultiplicity {estimate_multiplicity(variables, centre)}"
+        print(f"{summary}\tfound from {count} initial guesses")
+
+
+def cluster_roots(roots: np.ndarray, tolerance: float = 1e-5) -> tuple:
+    """Merge roots closer than tolerance into one, by putting them into
+    square cells of a grid and joining each occupied cell to its occupied
+    neighbours, so the work grows with the number of roots
+
+    :param roots: array of the roots found, nan for no root
+    :param tolerance: the size of the grid cells
+    :returns: tuple (centres, labels, counts), where centres has the mean of
+        each group of roots, labels gives the index of the group of each root
+        (-1 for nan) and counts the size of each group, i.e. its basin
+
+    """
+    roots = np.asarray(roots, dtype=complex).ravel()
+    labels = np.full(roots.size, -1)
+    is_found = np.isfinite(roots)
+    found = roots[is_found]
+    if found.size == 0:
+        return np.empty(0, dtype=complex), labels, np.empty(0, dtype=int)
+    real_cells = np.floor(found.real / tolerance).astype(np.int64)
+    imag_cells = np.floor(found.imag / tolerance).astype(np.int64)
+    # one integer key per cell, so the binning is a flat sort of integers
+    imag_min = imag_cells.min()
+    stride = imag_cells.max() - imag_min + 1
+    keys, cell_labels, cell_counts = np.unique(
+        real_cells * stride + (imag_cells - imag_min),
+        return_inverse=True,
+        return_counts=True,
+    )
+    cell_labels = cell_labels.ravel()
+    cell_sums = np.bincount(cell_labels, weights=found.real) + 1j * np.bincount(
+        cell_labels, weights=found.imag
+    )
+    occupied = np.stack([keys // stride, keys % stride + imag_min], axis=1)
+    # most roots land in a few cells, so the joining below only sees those
+    index_of_cell = {
+        cell: index for index, cell in enumerate(map(tuple, occupied.tolist()))
+    }
+    parents = list(range(len(occupied)))
+
+    def find_parent(index: int) -> int:
+        while parents[index] != index:
+            parents[index] = parents[parents[index]]
+            index = parents[index]
+        return index
+
+    for (real, imag), index in index_of_cell.items():
+        for shift in product((-1, 0, 1), repeat=2):
+            neighbour = index_of_cell.get((real + shift[0], imag + shift[1]))
+            if neighbour is not None:
+                parents[find_parent(neighbour)] = find_parent(index)
+    groups, group_labels = np.unique(
+        [find_parent(index) for index in range(len(occupied))], return_inverse=True
+    )
+    counts = np.bincount(group_labels, weights=cell_counts, minlength=groups.size)
+    sums = np.bincount(group_labels, weights=cell_sums.real, minlength=groups.size)
+    sums = sums + 1j * np.bincount(
+        group_labels, weights=cell_sums.imag, minlength=groups.size
+    )
+    labels[is_found] = group_labels[cell_labels]
+    return sums / counts, labels, counts.astype(int)
+
+
+def estimate_multiplicity(
+    variables: list, root: complex, accuracy: float = 1e-4, tolerance: float = 1e-10
+) -> int:
+    """Estimate how many times a polynomial has a root. A root of multiplicity
+    m is a simple root of the (m - 1)th derivative, so Halley's method on that
+    derivative polishes it to full precision even when the root was only
+    found to a few digits. The multiplicity is the largest m where the
+    polynomial and its first m - 1 derivatives all vanish at that point.
+
+    :param variables: a list of coefficients
+    :param root: the root, which only needs to be close
+    :param accuracy: how far root may be from the true root, so polishing that
+        moves further has found a different one
+    :param tolerance: how small a derivative is to count as zero, relative to
+        the size of its terms
+    :returns: the multiplicity
+
+    """
+    derivs = [ply.Polynomial(variables).trim()]
+    for _ in range(derivs[0].degree()):
+        derivs.append(derivs[-1].deriv())
+
+    def is_zero(order: int, x_val: complex) -> bool:
+        coeffs = derivs[order].coef
+        size = np.sum(np.abs(coeffs) * np.abs(x_val) ** np.arange(len(coeffs)))
+        return abs(derivs[order](x_val)) <= tolerance * size
+
+    for multiplicity in range(len(derivs) - 1, 1, -1):
+        polished, _ = iterate_newton_raphson(
+            derivs[multiplicity - 1].coef, complex(root), 0, "halley"
+        )
+        if (
+            polished is not None
+            and abs(polished - root) <= accuracy
+            and all(is_zero(order, polished) for order in range(multiplicity))
+        ):
+            return multiplicity
+    return 1
+
+
+def find_roots_batched(
+    coeffs: np.ndarray,
+    method: str = "companion",
+    polish_iterations: int = 2,
+    max_iterations: int = 500,
+) -> np.ndarray:
+    """Find every root of many polynomials of the same degree at once
+
+    :param coeffs: array of shape (M, degree + 1), one polynomial per row
+        with the lowest power first
+    :param method: "companion" for the eigenvalues of the companion matrices,
+        or "aberth" for iterate_aberth_ehrlich() on every row together
+    :param polish_iterations: Newton-Raphson steps to finish each root with
+    :param max_iterations: the most iterations for "aberth"
+    :returns: array of shape (M, degree) of the roots
+
+    """
+    coeffs = np.asarray(coeffs, dtype=complex)
+    degree = coeffs.shape[1] - 1
+    if np.any(coeffs[:, -1] == 0):
+        raise ValueError("The highest power must have a nonzero coefficient")
+    if method == "companion":
+        companion = np.zeros((coeffs.shape[0], degree, degree), dtype=complex)
+        companion[:, np.arange(1, degree), np.arange(degree - 1)] = 1
+        companion[:, :, -1] = -coeffs[:, :-1] / coeffs[:, -1:]
+        roots = np.linalg.eigvals(companion)
+    elif method == "aberth":
+        roots = iterate_aberth_ehrlich_batched(coeffs, max_iterations)
+    else:
+        raise ValueError(f"Unknown method {method}")
+    # Horner over the columns, each one broadcast against its row of roots
+    columns = coeffs.T[:, :, np.newaxis]
+    for _ in range(polish_iterations):
+        value, deriv = evaluate_polynomial_horner(columns, roots)
+        with np.errstate(all="ignore"):
+            step = value / deriv
+        roots = roots - np.where(np.isfinite(step), step, 0)
+    return roots
+
+
+def iterate_aberth_ehrlich_batched(
+    coeffs: np.ndarray, max_iterations: int
+) -> np.ndarray:
+    """iterate_aberth_ehrlich() for every row of coeffs at once, starting
+    each row as find_all_roots() does and stopping each row once it is done
+
+    :param coeffs: array of shape (M, degree + 1), lowest power first
+    :param max_iterations: the most iterations
+    :returns: array of shape (M, degree) of the roots
+
+    """
+    degree = coeffs.shape[1] - 1
+    monic = coeffs / coeffs[:, -1:]
+    centre = -monic[:, -2] / degree
+    radius = 2 * np.max(
+        np.abs(monic[:, degree - np.arange(1, degree + 1)])
+        ** (1 / np.arange(1, degree + 1)),
+        axis=1,
+    )
+    angles = 2 * np.pi * np.arange(degree) / degree + 0.4
+    roots = centre[:, np.newaxis] + np.maximum(radius, 1e-3)[:, np.newaxis] * np.exp(
+        1j * angles
+    )
+    columns = monic.T[:, :, np.newaxis]
+    abs_columns = np.abs(columns)
+    is_active = np.ones(coeffs.shape[0], dtype=bool)
+    for _ in range(max_iterations):
+        value, deriv = evaluate_polynomial_horner(
+            columns[:, is_active], roots[is_active]
         )
-        line[1] = complex(
-            round_with_decimal(9, np.real(line[1])),
-            round_with_decimal(9, np.imag(line[1])),
+        with np.errstate(all="ignore"):
+            newton_step = value / deriv
+            differences = (
+                roots[is_active, :, np.newaxis] - roots[is_active, np.newaxis, :]
+            )
+            differences[:, np.arange(degree), np.arange(degree)] = np.inf
+            repulsion = np.sum(1 / differences, axis=2)
+            correction = newton_step / (1 - newton_step * repulsion)
+        correction = np.where(np.isfinite(correction) & (value != 0), correction, 0)
+        roots[is_active] -= correction
+        value, _ = evaluate_polynomial_horner(columns[:, is_active], roots[is_active])
+        rounding, _ = evaluate_polynomial_horner(
+            abs_columns[:, is_active], np.abs(roots[is_active])
         )
-        # convert all values to string type and add some right padding
-        line = [val.strip("()").ljust(32) for val in list(map(str, line))]
-        print(padding + f"{padding}".join(line) + padding)
-    draw_boxes("bot", 2, 35)
-    # convert all values of roots to string type and print
-    print("\nSummary of roots found, to 6 significant figures")
-    print("\t\t".join(list(map(str, set(roots)))))
+        is_done = np.all(
+            (np.abs(correction) <= 1e-14 * (1 + np.abs(roots[is_active])))
+            | (np.abs(value) <= 4 * np.finfo(float).eps * rounding),
+            axis=1,
+        )
+        is_active[np.flatnonzero(is_active)[is_done]] = False
+        if not np.any(is_active):
+            break
+    return roots
+
+
+def print_all_roots(variables: list):
+    """Print every root found at once by find_all_roots(), to compare with
+    the summary from format_many_roots()
+
+    :param variables: a list of coefficients
+
+    """
+    roots = find_all_roots(variables)
+    print("\nAll roots found at once (Aberth-Ehrlich), to 6 significant figures")
+    print(
+        "\t\t".join(
+            str(
+                complex(
+                    round_with_sigfigs(6, round_with_decimal(7, np.real(root))),
+                    round_with_sigfigs(6, round_with_decimal(7, np.imag(root))),
+                )
+            )
+            for root in roots
+        )
+    )
 
 
 def run_option_f():
@@ -359,7 +1443,8 @@ def run_option_f():
         f"Range picked: {x_min} + i*({x_min}...{x_max}) ... {x_max} + i({x_min}...{x_max})"
     )
     answers = find_many_roots([a_0, a_1, a_2, a_3, a_4], x_min, x_max, increment)
-    format_many_roots(answers)
+    format_many_roots(answers, [a_0, a_1, a_2, a_3, a_4])
+    print_all_roots([a_0, a_1, a_2, a_3, a_4])
 
 
 def run_option_g():
@@ -367,7 +1452,8 @@ def run_option_g():
     print("Testing for x^4 + x^3 - 12x^2 - 2x + 10")
     _ = input("Press anything to continue...")
     answers = find_many_roots([10, -2, -12, 1, 1], -4, 4, 0.8)
-    format_many_roots(answers)
+    format_many_roots(answers, [10, -2, -12, 1, 1])
+    print_all_roots([10, -2, -12, 1, 1])
 
 
 def round_with_decimal(decimal_places: int, value: float) -> float:
@@ -394,25 +1480,71 @@ def round_with_sigfigs(sig_figs: int, value: float) -> float:
     return float(f"{value:.{sig_figs}g}")
 
 
-def iterate_newton_raphson(variables: list, x_prev: complex, delta: float) -> tuple:
-    """Find the root of a polynomial using the Newton-Raphson method
+def iterate_newton_raphson(
+    variables: list,
+    x_prev: complex,
+    delta: float,
+    method: str = "newton",
+    multiplicity: int = None,
+) -> tuple:
+    """Find the root of a polynomial using the Newton-Raphson method, or one
+    of its higher order or multiple root versions
 
     :param variables: a list of coefficients
     :param x_prev: first value x_0
     :param delta: the minimum accuracy
-    :param is_alt: perform task (e) if false, (f) if true
+    :param method: "newton", "halley", "householder" (order 3), or
+        "schroder" (Newton-Raphson times the multiplicity of the root)
+    :param multiplicity: the multiplicity for "schroder", estimated again at
+        every step if not given
     :returns: the root and the number of iterations performed
 
     """
     funct = ply.Polynomial(variables)
+    # the derivatives do not change, so only make them once
+    deriv_1 = funct.deriv(1)
+    deriv_2 = funct.deriv(2)
+    deriv_3 = funct.deriv(3)
+    abs_funct = ply.Polynomial(np.abs(funct.coef))
+    degree = max(funct.degree(), 1)
     x_next = 0
     max_iterations = 1000
     iteration = 0
     while True:
-        deriv = funct.deriv(1)(x_prev)
+        value = funct(x_prev)
+        deriv = deriv_1(x_prev)
+        if method != "newton" and abs(value) <= 4 * np.finfo(float).eps * abs_funct(
+            abs(x_prev)
+        ):
+            # f is only rounding error here, as in is_roots_converged(), so
+            # near a multiple root the steps would just bounce around
+            return (complex(f"{x_prev:.15g}"), iteration)
         if deriv == 0 or max_iterations == 0:
             return (None, None)
-        x_next = x_prev - funct(x_prev) / deriv
+        if method == "newton":
+            step = value / deriv
+        elif method == "schroder" and multiplicity is not None:
+            step = multiplicity * value / deriv
+        elif method == "schroder":
+            # f'^2 / (f'^2 - f f'') tends to the multiplicity near a root, so
+            # only use it once it is close to a whole number
+            estimate = deriv**2 / (deriv**2 - value * deriv_2(x_prev))
+            nearest = round(estimate.real) if np.isfinite(estimate) else 1
+            if not 1 <= nearest <= degree or abs(estimate - nearest) > 0.1:
+                nearest = 1
+            step = nearest * value / deriv
+        elif method == "halley":
+            step = 2 * value * deriv / (2 * deriv**2 - value * deriv_2(x_prev))
+        elif method == "householder":
+            second = deriv_2(x_prev)
+            step = (6 * value * deriv**2 - 3 * value**2 * second) / (
+                6 * deriv**3 - 6 * value * deriv * second + value**2 * deriv_3(x_prev)
+            )
+        else:
+            raise ValueError(f"Unknown method {method}")
+        if not np.isfinite(step):
+            return (None, None)
+        x_next = x_prev - step
         iteration += 1
         if np.abs(x_prev - x_next) <= delta:
             return (complex(f"{x_next:.15g}"), iteration)
@@ -432,26 +1564,462 @@ def find_many_roots(
     :returns: a list of number
 
     """
-    x_val_imag = x_min
-    x_val_real = x_min
-    roots = []
-    delta = 0.000009
+    seeds, roots, iterations = find_many_roots_grid(
+        variables, x_min, x_max, increment, 0.000009
+    )
     # iterate through all complex values in range before going to the next real value
-    while x_val_real <= x_max:
-        while x_val_imag <= x_max:
-            x_val = complex(x_val_real, x_val_imag)
-            answer = iterate_newton_raphson(variables, x_val, delta)
-            roots.append(
-                [
-                    x_val,
-                    answer[0],
-                    answer[1],
-                ]
-            )
-            x_val_imag = round_with_decimal(3, x_val_imag + increment)
-        x_val_imag = x_min
-        x_val_real = round_with_decimal(3, x_val_real + increment)
-    return roots
+    return [
+        (
+            [seed, complex(f"{root:.15g}"), int(iteration)]
+            if iteration > 0
+            else [seed, None, None]
+        )
+        for seed, root, iteration in zip(
+            seeds.ravel().tolist(), roots.ravel(), iterations.ravel()
+        )
+    ]
+
+
+def find_many_roots_grid(
+    variables: list, x_min: float, x_max: float, increment: float, delta: float
+) -> tuple:
+    """Find many roots using Newton-Raphson, running every initial guess
+    in the complex square at the same time
+
+    :param variables: a list of coefficients
+    :param x_min: minimum x_0 value, for both real and imaginary parts
+    :param x_max: maximum x_0 value, for both real and imaginary parts
+    :param increment: increment x_0 by this value
+    :param delta: the minimum accuracy
+    :returns: tuple of 2d arrays (x_0, root, iterations), where the rows go
+        along the real part and the columns along the imaginary part
+
+    """
+    guesses = get_guess_values(x_min, x_max, increment)
+    seeds = guesses[:, np.newaxis] + 1j * guesses[np.newaxis, :]
+    roots, iterations = iterate_newton_raphson_grid(variables, seeds, delta)
+    return seeds, roots, iterations
+
+
+def find_many_roots_parallel(
+    variables: list,
+    x_min: float,
+    x_max: float,
+    increment: float,
+    delta: float,
+    workers: int | None = None,
+    tile_size: int = 256,
+) -> tuple:
+    """Do find_many_roots_grid() with the grid cut into square tiles, which
+    are solved in separate processes and copied into the results as each
+    one finishes
+
+    :param variables: a list of coefficients
+    :param x_min: minimum x_0 value, for both real and imaginary parts
+    :param x_max: maximum x_0 value, for both real and imaginary parts
+    :param increment: increment x_0 by this value
+    :param delta: the minimum accuracy
+    :param workers: the number of processes, None for one per CPU
+    :param tile_size: the number of x_0 along each side of a tile
+    :returns: tuple of 2d arrays (x_0, root, iterations), as in find_many_roots_grid()
+
+    """
+    guesses = get_guess_values(x_min, x_max, increment)
+    seeds = guesses[:, np.newaxis] + 1j * guesses[np.newaxis, :]
+    roots = np.empty(seeds.shape, dtype=complex)
+    iterations = np.empty(seeds.shape, dtype=int)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        tiles = {}
+        for row in range(0, seeds.shape[0], tile_size):
+            for col in range(0, seeds.shape[1], tile_size):
+                tile = np.s_[row : row + tile_size, col : col + tile_size]
+                future = executor.submit(
+                    iterate_newton_raphson_grid, variables, seeds[tile], delta
+                )
+                tiles[future] = tile
+        for future in as_completed(tiles):
+            roots[tiles[future]], iterations[tiles[future]] = future.result()
+    return seeds, roots, iterations
+
+
+def render_basins(
+    variables: list,
+    x_min: float,
+    x_max: float,
+    size: int,
+    path: str,
+    tile_size: int = 1024,
+    delta: float = 1e-9,
+    max_iterations: int = 100,
+    preview_size: int = 1024,
+) -> tuple:
+    """Draw which root Newton-Raphson reaches from every point of a complex
+    square, one tile at a time into arrays saved on disk, so only one tile
+    is ever held in memory. Running again with the same arguments skips the
+    tiles that are already done.
+
+    Saves path + "_roots.npy" with the index into find_all_roots() of the
+    root reached, or -1 for none, path + "_iterations.npy" with the number of
+    iterations, path + "_done.npy" marking the finished tiles,
+    path + "_settings.json" with the arguments, which must match to carry on,
+    and a smaller picture of the roots shaded by the iterations as
+    path + "_preview.png"
+
+    :param variables: a list of coefficients
+    :param x_min: minimum value, for both real and imaginary parts
+    :param x_max: maximum value, for both real and imaginary parts
+    :param size: the number of points along each side, with the real part
+        along the rows and the imaginary part going down the columns
+    :param path: the start of the file names to save to
+    :param tile_size: the number of points along each side of a tile
+    :param delta: the minimum accuracy
+    :param max_iterations: the most iterations for each point
+    :param preview_size: the most pixels along each side of the preview
+    :returns: tuple of memmap arrays (root index, iterations)
+
+    """
+    if max_iterations > np.iinfo(np.uint16).max:
+        raise ValueError("max_iterations must fit in the uint16 iterations array")
+    if len(np.trim_zeros(np.asarray(variables), "b")) - 1 > np.iinfo(np.int8).max:
+        raise ValueError("The degree must fit in the int8 root index array")
+    known_roots = find_all_roots(variables)
+    # a render can only be carried on with exactly the same settings
+    settings = {
+        "variables": [to_json_pair(complex(value)) for value in variables],
+        "x_min": x_min,
+        "x_max": x_max,
+        "size": size,
+        "tile_size": tile_size,
+        "delta": delta,
+        "max_iterations": max_iterations,
+    }
+    is_resume = False
+    if os.path.exists(path + "_settings.json"):
+        with open(path + "_settings.json", encoding="utf-8") as file:
+            is_resume = json.load(file) == settings
+    tiles = -(-size // tile_size)
+    root_index = open_render_array(
+        path + "_roots.npy", (size, size), np.int8, is_resume
+    )
+    iterations = open_render_array(
+        path + "_iterations.npy", (size, size), np.uint16, is_resume
+    )
+    is_done = open_render_array(path + "_done.npy", (tiles, tiles), bool, is_resume)
+    with open(path + "_settings.json", "w", encoding="utf-8") as file:
+        json.dump(settings, file)
+    values = np.linspace(x_min, x_max, size)
+    for row, col in product(range(tiles), repeat=2):
+        if is_done[row, col]:
+            continue
+        tile = np.s_[
+            row * tile_size : (row + 1) * tile_size,
+            col * tile_size : (col + 1) * tile_size,
+        ]
+        seeds = values[::-1][tile[0], np.newaxis] * 1j + values[np.newaxis, tile[1]]
+        roots, tile_iterations = iterate_newton_raphson_grid(
+            variables, seeds, delta, max_iterations
+        )
+        # a point that converged is next to the root it converged to
+        nearest = np.argmin(np.abs(roots[..., np.newaxis] - known_roots), axis=-1)
+        root_index[tile] = np.where(np.isnan(roots), -1, nearest)
+        iterations[tile] = tile_iterations
+        root_index.flush()
+        iterations.flush()
+        # only mark the tile once its results are safely on disk
+        is_done[row, col] = True
+        is_done.flush()
+    step = max(1, -(-size // preview_size))
+    preview_index = np.asarray(root_index[::step, ::step])
+    shade = 1 - 0.7 * np.asarray(iterations[::step, ::step]) / max_iterations
+    image = plt.get_cmap("tab10")(preview_index % 10)[..., :3] * shade[..., np.newaxis]
+    image[preview_index < 0] = 0
+    plt.imsave(path + "_preview.png", image)
+    return root_index, iterations
+
+
+def open_render_array(
+    file_name: str, shape: tuple, dtype: type, is_resume: bool
+) -> np.memmap:
+    """Open an array saved by render_basins() to carry on with, or make a new
+    one filled with zeros if there is none of the right shape
+
+    :param file_name: the .npy file
+    :param shape: the shape of the array
+    :param dtype: the type of the array
+    :param is_resume: False to always make a new array
+    :returns: the array as a memmap
+
+    """
+    if is_resume and os.path.exists(file_name):
+        array = np.lib.format.open_memmap(file_name, mode="r+")
+        if array.shape == shape and array.dtype == dtype:
+            return array
+        del array
+    return np.lib.format.open_memmap(file_name, mode="w+", dtype=dtype, shape=shape)
+
+
+def get_guess_values(x_min: float, x_max: float, increment: float) -> np.ndarray:
+    """Step from x_min to x_max the same way find_many_roots() always has,
+    rounding to 3 dp at each step
+
+    :param x_min: minimum value
+    :param x_max: maximum value
+    :param increment: increment by this value
+    :returns: array of values
+
+    """
+    values = []
+    value = x_min
+    while value <= x_max:
+        values.append(value)
+        value = round_with_decimal(3, value + increment)
+    return np.array(values, dtype=float)
+
+
+def iterate_newton_raphson_grid(
+    variables: list, seeds: np.ndarray, delta: float, max_iterations: int = 1000
+) -> tuple:
+    """Find roots of a polynomial using the Newton-Raphson method, for a whole
+    array of first values at once. Follows iterate_newton_raphson() exactly.
+    Whenever half of the values still being iterated have finished, the rest
+    are packed into a smaller array, so the work follows what is left to do.
+
+    :param variables: a list of coefficients
+    :param seeds: array of first values x_0
+    :param delta: the minimum accuracy
+    :param max_iterations: the most iterations before giving up
+    :returns: tuple of arrays (root, iterations), where root is nan and
+        iterations is 0 for any x_0 that failed
+
+    """
+    x_prev = np.array(seeds, dtype=complex).ravel()
+    roots = np.full(x_prev.shape, complex(np.nan, np.nan))
+    iterations = np.zeros(x_prev.shape, dtype=int)
+    # where each value being iterated came from in seeds
+    indices = np.arange(x_prev.size)
+    is_active = np.ones(x_prev.shape, dtype=bool)
+    for iteration in range(1, max_iterations + 1):
+        value, deriv = evaluate_polynomial_horner(variables, x_prev)
+        is_active &= deriv != 0
+        with np.errstate(all="ignore"):
+            x_next = np.where(is_active, x_prev - value / deriv, x_prev)
+            is_done = is_active & (np.abs(x_prev - x_next) <= delta)
+        roots[indices[is_done]] = x_next[is_done]
+        iterations[indices[is_done]] = iteration
+        # inf or nan can never get within delta, so those have failed already
+        is_active &= ~is_done & np.isfinite(x_next)
+        remaining = np.count_nonzero(is_active)
+        if remaining == 0:
+            break
+        if remaining <= is_active.size // 2:
+            indices, x_next = indices[is_active], x_next[is_active]
+            is_active = np.ones(remaining, dtype=bool)
+        x_prev = x_next
+    return roots.reshape(np.shape(seeds)), iterations.reshape(np.shape(seeds))
+
+
+def evaluate_polynomial_horner(variables: list, x_vals: np.ndarray) -> tuple:
+    """Evaluate a polynomial and its derivative together with Horner's method
+
+    :param variables: a list of coefficients, lowest power first
+    :param x_vals: the values to evaluate at
+    :returns: tuple of (polynomial, derivative) at x_vals
+
+    """
+    value = np.zeros_like(x_vals)
+    deriv = np.zeros_like(x_vals)
+    for coeff in variables[::-1]:
+        deriv = deriv * x_vals + value
+        value = value * x_vals + coeff
+    return value, deriv
+
+
+def find_all_roots(
+    variables: list, delta: float = 1e-12, max_iterations: int = 500
+) -> np.ndarray:
+    """Find every root of a polynomial of any degree at once with the
+    Aberth-Ehrlich method, going back to Durand-Kerner if that fails
+
+    :param variables: a list of coefficients, lowest power first
+    :param delta: stop once every root moves by less than this
+    :param max_iterations: the most iterations for each method
+    :returns: array of the roots, as many as the degree
+
+    """
+    coeffs = np.trim_zeros(np.asarray(variables, dtype=complex), "b")
+    degree = len(coeffs) - 1
+    if degree < 1:
+        return np.array([], dtype=complex)
+    # start on a circle around the mean of the roots, with a radius that
+    # holds all of them, turned so no guess sits on a line of symmetry
+    centre = -coeffs[-2] / (degree * coeffs[-1])
+    radius = 2 * max(
+        np.abs(coeffs[degree - num] / coeffs[-1]) ** (1 / num)
+        for num in range(1, degree + 1)
+    )
+    angles = 2 * np.pi * np.arange(degree) / degree + 0.4
+    guesses = centre + max(radius, 1e-3) * np.exp(1j * angles)
+    roots, is_converged = iterate_aberth_ehrlich(coeffs, guesses, delta, max_iterations)
+    if not is_converged:
+        roots, _ = iterate_durand_kerner(coeffs, guesses, delta, max_iterations)
+    return np.sort_complex(roots)
+
+
+def iterate_aberth_ehrlich(
+    coeffs: np.ndarray, roots: np.ndarray, delta: float, max_iterations: int
+) -> tuple:
+    """Improve all the roots together, each Newton step pushed away from the
+    other roots so that they do not all run to the same one
+
+    :param coeffs: the coefficients, lowest power first
+    :param roots: first guesses for every root
+    :param delta: stop once every root moves by less than this
+    :param max_iterations: the most iterations
+    :returns: tuple of (roots, whether they converged)
+
+    """
+    roots = roots.copy()
+    for _ in range(max_iterations):
+        value, deriv = evaluate_polynomial_horner(coeffs, roots)
+        with np.errstate(all="ignore"):
+            newton_step = value / deriv
+            differences = roots[:, np.newaxis] - roots[np.newaxis, :]
+            np.fill_diagonal(differences, np.inf)
+            repulsion = np.sum(1 / differences, axis=1)
+            correction = newton_step / (1 - newton_step * repulsion)
+        correction = np.where(value == 0, 0, correction)
+        if not np.all(np.isfinite(correction)):
+            return roots, False
+        roots -= correction
+        if is_roots_converged(coeffs, roots, correction, delta):
+            return roots, True
+    return roots, False
+
+
+def iterate_durand_kerner(
+    coeffs: np.ndarray, roots: np.ndarray, delta: float, max_iterations: int
+) -> tuple:
+    """Improve all the roots together with the Durand-Kerner (Weierstrass)
+    method, slower than iterate_aberth_ehrlich() but harder to break
+
+    :param coeffs: the coefficients, lowest power first
+    :param roots: first guesses for every root
+    :param delta: stop once every root moves by less than this
+    :param max_iterations: the most iterations
+    :returns: tuple of (roots, whether they converged)
+
+    """
+    roots = roots.copy()
+    for _ in range(max_iterations):
+        value, _ = evaluate_polynomial_horner(coeffs, roots)
+        differences = roots[:, np.newaxis] - roots[np.newaxis, :]
+        np.fill_diagonal(differences, 1)
+        with np.errstate(all="ignore"):
+            correction = value / (coeffs[-1] * np.prod(differences, axis=1))
+        correction = np.where(np.isfinite(correction), correction, 0)
+        roots -= correction
+        if is_roots_converged(coeffs, roots, correction, delta):
+            return roots, True
+    return roots, False
+
+
+def is_roots_converged(
+    coeffs: np.ndarray, roots: np.ndarray, correction: np.ndarray, delta: float
+) -> bool:
+    """Check if every root has either stopped moving or is as close as
+    rounding error allows, which multiple roots need as they never settle
+
+    :param coeffs: the coefficients, lowest power first
+    :param roots: the current roots
+    :param correction: how far each root moved in the last step
+    :param delta: the minimum accuracy
+    :returns: True if every root is done
+
+    """
+    value, _ = evaluate_polynomial_horner(coeffs, roots)
+    rounding, _ = evaluate_polynomial_horner(np.abs(coeffs), np.abs(roots))
+    return bool(
+        np.all(
+            (np.abs(correction) <= delta)
+            | (np.abs(value) <= 4 * np.finfo(float).eps * rounding)
+        )
+    )
+
+
+def run_option_i():
+    """Run option i"""
+    print("Estimating pi = 4 * arctan(1) with series acceleration.")
+    _ = input("Press anything to continue...")
+    N = take_input_n()
+    rows = compare_accelerations(1, N)
+    write_table(
+        ["Method", "Approx (12sf)", "Diff (3sf)", "Time (s, 3sf)"],
+        [
+            [name for name, _, _ in rows],
+            [4 * answer for _, answer, _ in rows],
+            [abs(np.pi - 4 * answer) for _, answer, _ in rows],
+            [seconds for _, _, seconds in rows],
+        ],
+        ["", ".12g", ".3g", ".3g"],
+    )
+    answer, method = find_arctan_accelerated(1, N)
+    print(f"Picked automatically: {method}, giving pi = {4 * answer}")
+
+
+def run_option_j():
+    """Run option j"""
+    print("Evaluating pi to many decimal places with Machin's formula.")
+    _ = input("Press anything to continue...")
+    digits = take_input_n()
+    checkpoint = input("File to save progress in (leave blank for none): ").strip()
+    start = perf_counter()
+    calc_pi = find_pi_machin(digits, MACHIN_IDENTITY, checkpoint or None)
+    duration = perf_counter() - start
+    print(f"Time taken for {digits} decimal places: {duration} s")
+    if digits <= 1000:
+        print(calc_pi)
+    else:
+        print(f"{calc_pi[:52]}...{calc_pi[-50:]}")
+
+
+def run_option_k():
+    """Run option k"""
+    print("Searching for identities pi/4 = sum c * arctan(1/k) and timing each one.")
+    _ = input("Press anything to continue...")
+    max_k = take_input_int("the largest k")
+    max_coeff = take_input_int("the largest |c|")
+    max_terms = take_input_int("the largest number of arctans")
+    digits = take_input_int("the number of decimal places to time")
+    identities = search_machin_identities(max_k, max_coeff, max_terms)
+    print(f"Found {len(identities)} identities, written as c[k] for c * arctan(1/k).")
+    rows = benchmark_machin_identities(identities, digits)
+    write_table(
+        ["Identity", "Terms per digit (3sf)", "Terms", "Time (s, 3sf)"],
+        [
+            [format_machin_identity(row[0]) for row in rows],
+            [row[1] for row in rows],
+            [row[2] for row in rows],
+            [row[3] for row in rows],
+        ],
+        ["", ".3g", "d", ".3g"],
+        24,
+    )
+
+
+def run_option_l():
+    """Run option l"""
+    print("Comparing ways of finding arctan(x) for many random -10 <= x <= 10.")
+    _ = input("Press anything to continue...")
+    N = take_input_n()
+    size = take_input_int("the number of values of x")
+    print("Shrinking |x| below a threshold first helps every method.")
+    threshold = take_input_general("the threshold (0 for none)")
+    rows = compare_arctan_backends(size, N, threshold if threshold > 0 else None)
+    write_table(
+        ["Method", "Max diff (3sf)", "Values/s (3sf)"],
+        [[row[0] for row in rows], [row[1] for row in rows], [row[2] for row in rows]],
+        ["", ".3g", ".3g"],
+    )
 
 
 def run_option_h():
@@ -461,7 +2029,10 @@ def run_option_h():
         "(b) print a table of values of arctan(x) for -2 <= x <= 2 using both approximation and",
         "\n\tbuilt-in method with N number of iterations",
     )
-    print("(c) evaluate pi to 7 significant digits using naive method as used in (a)")
+    print(
+        "(c) evaluate pi to a chosen tolerance (5e-7 for 7 significant digits)",
+        "using naive method as used in (a)",
+    )
     print("(d) evaluate pi to 12 decimal places using another identity")
     print(
         "(e) to use the Newton-Raphson method to approximate a root of a polynomial, takes in 5",
@@ -475,14 +2046,458 @@ def run_option_h():
         "\n\tWork with complex roots",
     )
     print("(g) test method in (f) with x^4+x^3-12x^2-2x+10")
+    print(
+        "(i) evaluate pi as in (c) but speed up the series with Euler, Aitken, Levin",
+        "\n\tand Richardson transformations, timing each one",
+    )
+    print(
+        "(j) evaluate pi to any number of decimal places with Machin's formula, takes in",
+        "\n\tthe number of decimal places and optionally a file to save progress in",
+    )
+    print(
+        "(k) search for Machin-like identities for pi and rank them by how fast they are,",
+        "\n\ttakes in the largest k, coefficient and number of arctans, and the decimal places",
+    )
+    print(
+        "(l) compare the Taylor series with a fitted Chebyshev polynomial and CORDIC for",
+        "\n\tarctan(x), where N is the degree of the polynomial or CORDIC iterations,",
+        "\n\ttakes in N, the number of values of x, and a threshold to shrink |x| below",
+    )
+
+
+def run_benchmarks(repeats: int = 5) -> list:
+    """Time sum_to_arctan(), find_arctan(), iterate_newton_raphson() and
+    find_many_roots() over a few sizes and N, checking the answers against
+    np.arctan() and np.roots()
+
+    :param repeats: the number of runs to take the fastest of
+    :returns: a list of dicts with the kernel, size, N, fastest time in
+        seconds, values per second and largest error
+
+    """
+    rng = np.random.default_rng(0)
+    variables = [10, -2, -12, 1, 1]
+    exact_roots = np.roots(variables[::-1])
+    cases = []
+    for size, N in product([1000, 100000], [10, 100]):
+        small_x = rng.uniform(-0.9, 0.9, size)
+        x_values = rng.uniform(-2, 2, size)
+        cases.append(("sum_to_arctan", size, N, sum_to_arctan, (small_x, N), small_x))
+        cases.append(("find_arctan", size, N, find_arctan, (x_values, N), x_values))
+    for size in [10, 100]:
+        seeds = rng.uniform(-4, 4, size) + 1j * rng.uniform(-4, 4, size)
+        cases.append(
+            (
+                "iterate_newton_raphson",
+                size,
+                None,
+                lambda seeds: [
+                    iterate_newton_raphson(variables, seed, 1e-9)[0] for seed in seeds
+                ],
+                (seeds,),
+                None,
+            )
+        )
+    for increment in [0.8, 0.2]:
+        size = len(get_guess_values(-4, 4, increment)) ** 2
+        cases.append(
+            (
+                "find_many_roots",
+                size,
+                None,
+                lambda increment: [
+                    root for _, root, _ in find_many_roots(variables, -4, 4, increment)
+                ],
+                (increment,),
+                None,
+            )
+        )
+    results = []
+    for kernel, size, N, function, arguments, x_values in cases:
+        seconds = np.inf
+        for _ in range(repeats):
+            start = perf_counter()
+            answer = function(*arguments)
+            seconds = min(seconds, perf_counter() - start)
+        if x_values is not None:
+            error = np.max(np.abs(answer - np.arctan(x_values)))
+        else:
+            roots = np.array([root for root in answer if root is not None])
+            error = np.max(np.min(np.abs(roots[:, np.newaxis] - exact_roots), axis=1))
+        results.append(
+            {
+                "kernel": kernel,
+                "size": size,
+                "N": N,
+                "seconds": seconds,
+                "per_second": size / seconds,
+                "max_error": float(error),
+            }
+        )
+    return results
+
+
+def compare_benchmarks(results: list, baseline: list, threshold: float) -> list:
+    """Find the benchmarks that have become slower than a baseline
+
+    :param results: the results of run_benchmarks()
+    :param baseline: earlier results of run_benchmarks()
+    :param threshold: how many times slower counts as a slowdown, e.g. 1.2
+    :returns: a list of (kernel, size, N, how many times slower)
+
+    """
+    before = {(row["kernel"], row["size"], row["N"]): row for row in baseline}
+    slowdowns = []
+    for row in results:
+        old = before.get((row["kernel"], row["size"], row["N"]))
+        if old is not None and row["seconds"] > threshold * old["seconds"]:
+            slowdowns.append(
+                (row["kernel"], row["size"], row["N"], row["seconds"] / old["seconds"])
+            )
+    return slowdowns
+
+
+# the values each option needs in a job for run_job(), the rest have defaults
+JOB_FIELDS = {
+    "a": ("x", "N"),
+    "b": ("N",),
+    "c": (),
+    "d": (),
+    "e": ("coefficients", "x_0", "delta"),
+    "f": ("coefficients", "x_min", "x_max", "increment"),
+    "g": (),
+}
+# the values an option can take in a job but has defaults for
+JOB_OPTIONAL_FIELDS = {"c": ("tolerance",), "d": ("N",)}
+
+
+def run_job(job: dict) -> dict:
+    """Run one of options a-g without asking for any input, for run_batch()
+
+    :param job: the option as "option", and its values by name: "x" and "N"
+        for a, "N" for b, "tolerance" for c, "N" for d, "coefficients" (lowest
+        power first), "x_0" and "delta" for e, "coefficients", "x_min",
+        "x_max" and "increment" for f, and nothing for g
+    :returns: the job with its results added
+
+    """
+    check_job(job)
+    option = job["option"]
+    results = dict(job)
+    if option == "a":
+        results["answer"] = float(find_arctan(job["x"], job["N"]))
+    elif option == "b":
+        x_values = generate_values()
+        approx, computer = find_arctan(x_values, job["N"]), np.arctan(x_values)
+        results.update(
+            x=x_values.tolist(),
+            approx=approx.tolist(),
+            built_in=computer.tolist(),
+            diff=np.abs(approx - computer).tolist(),
+            mean_diff=float(np.mean(np.abs(approx - computer))),
+        )
+    elif option == "c":
+        arctan_one, N = find_arctan_adaptive(1, job.get("tolerance", 5e-7) / 4)
+        results.update(pi=4 * float(arctan_one), N=N)
+        results["diff"] = abs(np.pi - results["pi"])
+    elif option == "d":
+        N = job.get("N", 17)
+        results["pi"] = 4 * float(
+            find_arctan(1 / 2, N) + find_arctan(1 / 5, N) + find_arctan(1 / 8, N)
+        )
+        results["diff"] = abs(np.pi - results["pi"])
+    elif option == "e":
+        root, iteration = iterate_newton_raphson(
+            job["coefficients"], complex(job["x_0"]), job["delta"]
+        )
+        results.update(root=to_json_pair(root), iterations=iteration)
+    elif option in ("f", "g"):
+        if option == "g":
+            job = dict(
+                job,
+                coefficients=[10, -2, -12, 1, 1],
+                x_min=-4,
+                x_max=4,
+                increment=0.8,
+            )
+        answers = find_many_roots(
+            job["coefficients"], job["x_min"], job["x_max"], job["increment"]
+        )
+        centres, _, counts = cluster_roots(
+            np.array([np.nan if root is None else root for _, root, _ in answers])
+        )
+        results.update(
+            guesses=[
+                [to_json_pair(seed), to_json_pair(root), iteration]
+                for seed, root, iteration in answers
+            ],
+            roots=[to_json_pair(centre) for centre in centres.tolist()],
+            basins=counts.tolist(),
+        )
+    return results
+
+
+def check_job(job: dict):
+    """Check a job has an option that run_job() can run, and every value
+    that option needs, of the right type and range
+
+    :param job: the job, as in run_job()
+    :raises ValueError: naming the unknown option, or the missing or bad value
+
+    """
+    if not isinstance(job, dict):
+        raise ValueError("A job must be a JSON object")
+    option = job.get("option")
+    if option not in JOB_FIELDS:
+        raise ValueError(f"Option {option} cannot be run as a job")
+    for name in JOB_FIELDS[option]:
+        if name not in job:
+            raise ValueError(f"Option {option} needs a value for {name}")
+
+    def is_number(value) -> bool:
+        return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+    for name in JOB_FIELDS[option] + JOB_OPTIONAL_FIELDS.get(option, ()):
+        value = job.get(name)
+        if name not in job:
+            continue
+        if name == "N":
+            wanted = "a positive integer"
+            is_valid = is_number(value) and float(value).is_integer() and value > 0
+        elif name in ("tolerance", "delta", "increment"):
+            wanted = "a number above 0"
+            is_valid = is_number(value) and value > 0
+        elif name == "coefficients":
+            wanted = "a list of numbers"
+            is_valid = (
+                isinstance(value, list)
+                and len(value) > 0
+                and all(is_number(coeff) for coeff in value)
+            )
+        elif name == "x_0":
+            wanted = "a complex number"
+            try:
+                is_valid = not isinstance(value, bool) and bool(
+                    np.isfinite(complex(value))
+                )
+            except (TypeError, ValueError):
+                is_valid = False
+        else:
+            wanted = "a number"
+            is_valid = is_number(value) and bool(np.isfinite(value))
+        if not is_valid:
+            raise ValueError(
+                f"Option {option} needs {name} to be {wanted}, not {value!r}"
+            )
+    if option == "f" and not job["x_min"] < job["x_max"]:
+        raise ValueError("Option f needs x_min to be below x_max")
+
+
+def try_job(job: dict) -> dict:
+    """Run a job with run_job(), but give back any error in the results
+    instead of raising it, so one bad job does not stop a whole batch
+
+    :param job: the job, as in run_job()
+    :returns: the results of run_job(), or the job with an "error" added
+
+    """
+    try:
+        return run_job(job)
+    except Exception as error:
+        results = dict(job) if isinstance(job, dict) else {"job": job}
+        results["error"] = f"{type(error).__name__}: {error}"
+        return results
+
+
+def to_json_pair(value: complex) -> list:
+    """Turn a complex number into [real, imaginary] for JSON
+
+    :param value: the complex number, or None
+    :returns: the pair, or None
+
+    """
+    return None if value is None else [value.real, value.imag]
+
+
+def run_batch(jobs: list, workers: int | None = None) -> list:
+    """Run many jobs with try_job() in separate processes
+
+    :param jobs: a list of jobs, as in run_job()
+    :param workers: the number of processes, None for one per CPU
+    :returns: the results of each job, in the same order, with an "error"
+        for any job that failed
+
+    """
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(try_job, jobs, chunksize=max(1, len(jobs) // 64)))
+
+
+def run_batch_mode(arguments: list):
+    """Run options a-g from the command line instead of the menu, and write
+    the results as JSON or CSV
+
+    :param arguments: the command line arguments, without the program name
+
+    """
+    parser = argparse.ArgumentParser(
+        description="Run the options of exercise 1 without the menu."
+    )
+    parser.add_argument("--jobs", help="a JSON file with a list of jobs")
+    parser.add_argument("--option", choices=list("abcdefg"), help="run one job")
+    parser.add_argument("--x", type=float)
+    parser.add_argument("--N", type=int)
+    parser.add_argument("--tolerance", type=float)
+    parser.add_argument("--coefficients", type=float, nargs="+")
+    parser.add_argument("--x_0", type=complex)
+    parser.add_argument("--delta", type=float)
+    parser.add_argument("--x_min", type=float)
+    parser.add_argument("--x_max", type=float)
+    parser.add_argument("--increment", type=float)
+    parser.add_argument("--output", help="the file to write to, default stdout")
+    parser.add_argument("--format", choices=["json", "csv"], default="json")
+    parser.add_argument("--workers", type=int, help="default one per CPU")
+    parser.add_argument(
+        "--benchmark", help="time the kernels and save the results to this JSON file"
+    )
+    parser.add_argument("--baseline", help="a JSON file from an earlier --benchmark")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=1.2,
+        help="how many times slower than the baseline to flag, default 1.2",
+    )
+    options = parser.parse_args(arguments)
+    if options.benchmark is not None:
+        run_benchmark_mode(options.benchmark, options.baseline, options.threshold)
+        return
+    if options.jobs is not None:
+        with open(options.jobs, encoding="utf-8") as file:
+            jobs = json.load(file)
+        if not isinstance(jobs, list):
+            parser.error("--jobs needs a JSON list of jobs")
+    elif options.option is not None:
+        values = vars(options)
+        jobs = [
+            {
+                name: values[name]
+                for name in [
+                    "option",
+                    "x",
+                    "N",
+                    "tolerance",
+                    "coefficients",
+                    "x_0",
+                    "delta",
+                    "x_min",
+                    "x_max",
+                    "increment",
+                ]
+                if values[name] is not None
+            }
+        ]
+        if "x_0" in jobs[0]:
+            jobs[0]["x_0"] = str(jobs[0]["x_0"])
+        missing = [name for name in JOB_FIELDS[options.option] if name not in jobs[0]]
+        if missing:
+            parser.error(
+                f"option {options.option} needs "
+                + " ".join(f"--{name}" for name in missing)
+            )
+        try:
+            check_job(jobs[0])
+        except ValueError as error:
+            parser.error(str(error))
+    else:
+        parser.error("give either --jobs or --option")
+    # a bad job in a file only fails itself, with an "error" in its results
+    if len(jobs) > 1:
+        results = run_batch(jobs, options.workers)
+    else:
+        results = [try_job(job) for job in jobs]
+    failed = sum("error" in result for result in results)
+    if failed:
+        print(
+            f"{failed} of {len(results)} jobs failed, see their error", file=sys.stderr
+        )
+    if options.output is None:
+        write_batch_results(results, options.format, sys.stdout)
+    else:
+        with open(options.output, "w", encoding="utf-8", newline="") as file:
+            write_batch_results(results, options.format, file)
+
+
+def run_benchmark_mode(file_name: str, baseline_name: str | None, threshold: float):
+    """Run run_benchmarks(), print and save the results, and exit with an
+    error if any kernel is slower than the baseline by more than threshold
+
+    :param file_name: the JSON file to save the results to
+    :param baseline_name: a JSON file of earlier results, or None
+    :param threshold: how many times slower counts as a slowdown
+
+    """
+    results = run_benchmarks()
+    write_table(
+        ["Kernel", "Size", "N", "Seconds", "Values/s", "Max error"],
+        [
+            [row["kernel"] for row in results],
+            [row["size"] for row in results],
+            [str(row["N"] or "") for row in results],
+            [row["seconds"] for row in results],
+            [row["per_second"] for row in results],
+            [row["max_error"] for row in results],
+        ],
+        ["", "d", "", ".3g", ".3g", ".3g"],
+        24,
+    )
+    with open(file_name, "w", encoding="utf-8") as file:
+        json.dump(results, file, indent=1)
+    if baseline_name is None:
+        return
+    with open(baseline_name, encoding="utf-8") as file:
+        slowdowns = compare_benchmarks(results, json.load(file), threshold)
+    for kernel, size, N, ratio in slowdowns:
+        print(
+            f"Slower: {kernel} with size {size} and N {N} is {ratio:.2f}x the baseline"
+        )
+    if slowdowns:
+        sys.exit(1)
+    print(f"No kernel is more than {threshold}x slower than the baseline")
+
+
+def write_batch_results(results: list, file_format: str, file):
+    """Write the results of run_batch() as JSON, or as CSV with one row per
+    job and any lists written as JSON in their cell
+
+    :param results: the results of each job
+    :param file_format: "json" or "csv"
+    :param file: where to write them
+
+    """
+    if file_format == "json":
+        json.dump(results, file, indent=1)
+        file.write("\n")
+        return
+    names = list(dict.fromkeys(name for result in results for name in result))
+    writer = csv.DictWriter(file, names)
+    writer.writeheader()
+    for result in results:
+        writer.writerow(
+            {
+                name: json.dumps(value) if isinstance(value, list) else value
+                for name, value in result.items()
+            }
+        )
 
 
 def main():
     """Driver code"""
+    if len(sys.argv) > 1:
+        run_batch_mode(sys.argv[1:])
+        return
     user_input = "0"
     while user_input != "q":
         user_input = input(
-            'Enter a choice, "a", "b", "c", "d", "e", "f", "g", "h" for help, or "q" to quit: '
+            'Enter a choice, "a", "b", "c", "d", "e", "f", "g", "i", "j", "k", "l", "h" for help, or "q" to quit: '
         )
         print("You entered the choice: ", user_input)
         print(f"You have chosen part ({user_input})")
@@ -500,6 +2515,14 @@ def main():
             run_option_f()
         elif user_input == "g":
             run_option_g()
+        elif user_input == "i":
+            run_option_i()
+        elif user_input == "j":
+            run_option_j()
+        elif user_input == "k":
+            run_option_k()
+        elif user_input == "l":
+            run_option_l()
         elif user_input == "h":
             run_option_h()
         elif user_input != "q":
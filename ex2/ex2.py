@@ -4,10 +4,33 @@
 Exercise 2
 """
 from decimal import Decimal
+from functools import lru_cache
 import sys
 import numpy as np
 import matplotlib.pyplot as plt
 
+# Butcher tableau of the Dormand-Prince method, one row per stage after the
+# first, and the difference between its 5th and 4th order answers
+DORMAND_PRINCE_STAGES = (
+    np.array([1 / 5]),
+    np.array([3 / 40, 9 / 40]),
+    np.array([44 / 45, -56 / 15, 32 / 9]),
+    np.array([19372 / 6561, -25360 / 2187, 64448 / 6561, -212 / 729]),
+    np.array([9017 / 3168, -355 / 33, 46732 / 5247, 49 / 176, -5103 / 18656]),
+    np.array([35 / 384, 0, 500 / 1113, 125 / 192, -2187 / 6784, 11 / 84]),
+)
+DORMAND_PRINCE_ERROR = np.array(
+    [
+        71 / 57600,
+        0,
+        -71 / 16695,
+        71 / 1920,
+        -17253 / 339200,
+        22 / 525,
+        -1 / 40,
+    ]
+)
+
 ###################
 #  CLASS OBJECTS  #
 ###################
@@ -33,6 +56,189 @@ class Jumper:  # pylint: disable=too-few-public-methods
         self.starting_height = starting_height
 
 
+class JumperBatch:  # pylint: disable=too-few-public-methods
+    """JumperBatch is many Jumpers freefalling together, with each property
+    held as an array with one value per jumper"""
+
+    __slots__ = ("cross_sec_area", "drag_coeff", "mass", "starting_height")
+
+    def __init__(self, drag_coeff, starting_height, mass):
+        """Properties of the bodies, each a float or an array, where floats
+        are shared by every jumper
+
+        :cross_sec_area: of bodies
+        :drag_coeff: of bodies
+        :mass: of bodies
+        :starting_height: of bodies
+
+        """
+        self.cross_sec_area = 0.4
+        self.drag_coeff, self.starting_height, self.mass = (
+            np.array(values, dtype="float64").ravel()
+            for values in np.broadcast_arrays(drag_coeff, starting_height, mass)
+        )
+
+    def select(self, members: np.ndarray) -> "JumperBatch":
+        """Pick out some of the jumpers
+
+        :param members: index or boolean mask of the jumpers to keep
+        :returns: a JumperBatch of only those jumpers
+
+        """
+        return JumperBatch(
+            self.drag_coeff[members], self.starting_height[members], self.mass[members]
+        )
+
+
+class Atmosphere:
+    """Atmosphere holds tables of air density and speed of sound by height,
+    and reads values off them by linear interpolation"""
+
+    __slots__ = (
+        "profile",
+        "constants",
+        "min_height",
+        "step",
+        "densities",
+        "sound_speeds",
+        "table_lists",
+    )
+
+    def __init__(
+        self,
+        profile: str,
+        constants: tuple,
+        heights: tuple = (-1000, 100000),
+        step: float = 1.0,
+    ):
+        """Properties of the atmosphere
+
+        :profile: "exponential" for density falling off with the scale height
+            and temperature in three bands, or "standard" for the layers of
+            the 1976 US Standard Atmosphere up to 86 km
+        :constants: tuple of (rho_0, scale_height, gamma, molar_gas_constant,
+            molar_gas_mass, grav) from the global variables
+        :min_height: of the tables
+        :step: between heights in the tables
+        :densities: table of air density
+        :sound_speeds: table of the speed of sound
+        :table_lists: both tables as Python lists, for looking up one height
+
+        """
+        self.profile = profile
+        self.constants = constants
+        self.min_height = heights[0]
+        self.step = step
+        self.densities, self.sound_speeds = self.calculate_profile(
+            np.arange(heights[0], heights[1] + step, step)
+        )
+        self.table_lists = (self.densities.tolist(), self.sound_speeds.tolist())
+
+    def calculate_profile(self, y_vals: np.ndarray) -> tuple:
+        """Evaluate density and speed of sound directly, without the tables
+
+        :param y_vals: y array
+        :returns: tuple of arrays (density, speed of sound)
+
+        """
+        rho_0, scale_height, gamma, gas_constant, gas_mass, grav = self.constants
+        if self.profile == "exponential":
+            temp_conditions = [
+                y_vals <= sys.float_info.epsilon + 11000,
+                (11000 - sys.float_info.epsilon < y_vals)
+                & (y_vals <= sys.float_info.epsilon + 25100),
+            ]
+            temp_choices = [288.0 - 0.0065 * y_vals, 216.5]
+            temp_vals = np.select(temp_conditions, temp_choices, 141.3 + 0.003 * y_vals)
+            density_vals = rho_0 * np.exp(-y_vals / scale_height)
+        elif self.profile == "standard":
+            # each layer starts at a height, temperature and pressure, with a
+            # fixed rate of temperature change
+            bases = np.array([0, 11000, 20000, 32000, 47000, 51000, 71000, 84852])
+            lapse_rates = np.array([-0.0065, 0, 0.001, 0.0028, 0, -0.0028, -0.002, 0])
+            base_temps = 288.15 + np.concatenate(
+                ([0], np.cumsum(lapse_rates[:-1] * np.diff(bases)))
+            )
+            base_pressures = [101325.0]
+            for layer in range(len(bases) - 1):
+                base_pressures.append(
+                    calculate_layer_pressure(
+                        base_pressures[-1],
+                        base_temps[layer],
+                        lapse_rates[layer],
+                        bases[layer + 1] - bases[layer],
+                        grav * gas_mass / gas_constant,
+                    )
+                )
+            layer = np.clip(np.searchsorted(bases, y_vals, "right") - 1, 0, None)
+            temp_vals = base_temps[layer] + lapse_rates[layer] * (y_vals - bases[layer])
+            pressure_vals = calculate_layer_pressure(
+                np.array(base_pressures)[layer],
+                base_temps[layer],
+                lapse_rates[layer],
+                y_vals - bases[layer],
+                grav * gas_mass / gas_constant,
+            )
+            density_vals = pressure_vals * gas_mass / (gas_constant * temp_vals)
+        else:
+            raise ValueError(f"Unknown atmosphere profile {self.profile}")
+        return density_vals, np.sqrt(gamma * gas_constant * temp_vals / gas_mass)
+
+    def density(self, y_vals):
+        """Look up air density
+
+        :param y_vals: a height or y array
+        :returns: density at each height
+
+        """
+        return self.interpolate(self.densities, 0, y_vals)
+
+    def sound_speed(self, y_vals):
+        """Look up the speed of sound
+
+        :param y_vals: a height or y array
+        :returns: speed of sound at each height
+
+        """
+        return self.interpolate(self.sound_speeds, 1, y_vals)
+
+    def interpolate(self, table: np.ndarray, column: int, y_vals):
+        """Interpolate linearly in a table, and evaluate any height outside of
+        the table with calculate_profile()
+
+        :param table: the table of values
+        :param column: which value calculate_profile() gives for the table
+        :param y_vals: a height or y array
+        :returns: the value at each height
+
+        """
+        if isinstance(y_vals, float) or np.ndim(y_vals) == 0:
+            # a list and plain floats skip numpy's dispatch, which costs more
+            # than the lookup itself for a single height
+            position = (float(y_vals) - self.min_height) / self.step
+            table_list = self.table_lists[column]
+            if 0 <= position < len(table_list) - 1:
+                idx = int(position)
+                lower = table_list[idx]
+                return lower + (position - idx) * (table_list[idx + 1] - lower)
+            return float(self.calculate_profile(np.array([y_vals]))[column][0])
+        position = (np.asarray(y_vals, dtype="float64") - self.min_height) / self.step
+        # positions outside the table are replaced below, so clipping the
+        # index in take() is enough to keep the lookups inside it
+        with np.errstate(invalid="ignore"):
+            idx = position.astype(np.intp)
+            lower = table.take(idx, mode="clip")
+            values = lower + (position - idx) * (
+                table.take(idx + 1, mode="clip") - lower
+            )
+        is_outside = ~((position >= 0) & (position <= table.size - 1))
+        if np.any(is_outside):
+            values[is_outside] = self.calculate_profile(
+                np.asarray(y_vals, dtype="float64")[is_outside]
+            )[column]
+        return values
+
+
 class StringWave:
     """StringWave holds material properties of the string and also its Gaussian wavepacket"""
 
@@ -182,6 +388,43 @@ def run_option_f(global_vars: dict, wavepacket: StringWave):
     plot_gammas_std(gammas, std_solution)
 
 
+def run_option_g(jumper: Jumper, global_vars: dict):
+    """Execute option g, comparing the adaptive RK45 method with the Euler
+    method at a timestep of 0.01 s for varying air density
+
+    :param jumper: from Jumper class
+    :param global_vars: global variables
+
+    """
+    tolerance = 1e-6
+    print(
+        f"Comparing RK45 with a tolerance of {tolerance} against the Euler",
+        "method with a timestep of 0.01 s, with varying air density",
+    )
+    _ = input("Press anything to continue...")
+    euler_vars = dict(global_vars, timestep=0.01)
+    t_euler, _, vy_euler = calculate_numerical_predictions(
+        jumper, euler_vars, False, False
+    )
+    t_rk45, _, vy_rk45 = calculate_adaptive_predictions(
+        jumper, global_vars, False, tolerance
+    )
+    t_exact, _, vy_exact = calculate_adaptive_predictions(
+        jumper, global_vars, False, 1e-12
+    )
+    for name, t_vals, vy_vals in (
+        ("Euler", t_euler, vy_euler),
+        ("RK45", t_rk45, vy_rk45),
+    ):
+        print(
+            f"{name}: {np.size(t_vals) - 1} steps,",
+            f"duration {round_with_decimal(3, t_vals[-1])} s",
+            f"(error {abs(t_vals[-1] - t_exact[-1]):.2e} s),",
+            f"landing speed {round_with_decimal(3, abs(vy_vals[-1]))} m/s",
+            f"(error {abs(vy_vals[-1] - vy_exact[-1]):.2e} m/s)",
+        )
+
+
 ##############################
 #  PROBLEM 1 MAIN FUNCTIONS  #
 ##############################
@@ -221,8 +464,8 @@ def fill_dataset_jumper_num(
     is_plot: bool,
     is_verbose: bool,
 ) -> tuple:
-    """Retrieve results t, v, and y arrays and trim them to
-    stop after hitting the ground (numerical)
+    """Retrieve results t, v, and y arrays, which already stop where
+    the body hits the ground (numerical)
 
     :param jumper: from Jumper class
     :param global_vars: global variables
@@ -235,9 +478,6 @@ def fill_dataset_jumper_num(
     t_vals, y_vals, vy_vals = calculate_numerical_predictions(
         jumper, global_vars, is_constant_drag, is_verbose
     )
-    t_vals, y_vals, vy_vals = cut_negative_distance(
-        t_vals, y_vals, vy_vals, determine_negative_distance(y_vals, global_vars)
-    )
     if is_verbose:
         print(f"Duration of fall is {round_with_decimal(3,t_vals[-1])} s.")
     if is_plot:
@@ -278,6 +518,12 @@ def vary_timestep(jumper: Jumper, global_vars: dict):
         t_vals_ana, y_vals_ana, vy_vals_ana = fill_dataset_jumper_ana(
             jumper, global_vars, False, False
         )
+        # leave out the landing point, which is between two timesteps
+        t_vals_num, y_vals_num, vy_vals_num = (
+            t_vals_num[:-1],
+            y_vals_num[:-1],
+            vy_vals_num[:-1],
+        )
         stop_idx = np.min([np.size(t_vals_num), np.size(t_vals_ana)])
         std_data_y[idx] = np.std(y_vals_ana[:stop_idx] - y_vals_num[:stop_idx])
         std_data_vy[idx] = np.std(vy_vals_ana[:stop_idx] - vy_vals_num[:stop_idx])
@@ -299,14 +545,8 @@ def vary_mass(jumper: Jumper, global_vars: dict):
     )
     global_vars["timestep"] = 0.01
     masses = np.linspace(50, 80, 100)
-    duration, max_speed = np.zeros_like(masses), np.zeros_like(masses)
-    for idx, val in enumerate(masses):
-        jumper.mass = val
-        t_vals, _, vy_vals = fill_dataset_jumper_num(
-            jumper, global_vars, True, False, False
-        )
-        duration[idx] = t_vals[-1]
-        max_speed[idx] = np.max(np.absolute(vy_vals))
+    jumpers = JumperBatch(jumper.drag_coeff, jumper.starting_height, masses)
+    duration, max_speed, _ = calculate_numerical_batch(jumpers, global_vars, True)
     _ = input("Press anything to show plot...")
     plot_part_b_mass(masses, duration, max_speed)
 
@@ -360,18 +600,10 @@ def vary_jump_height(jumper: Jumper, global_vars: dict):
 
     """
     y_0 = np.linspace(1000, 40000, 300)
-    max_mach = np.full_like(y_0, 0)
-    max_speed = np.full_like(y_0, 0)
-    duration = np.full_like(y_0, 0)
-    for idx, val in enumerate(y_0):
-        jumper.starting_height = val
-        t_vals, y_vals, vy_vals = fill_dataset_jumper_num(
-            jumper, global_vars, False, False, False
-        )
-        mach_ratio, vy_vals_abs = calculate_mach_ratios(y_vals, vy_vals, global_vars)
-        max_speed[idx] = np.max(vy_vals_abs)
-        max_mach[idx] = np.max(mach_ratio)
-        duration[idx] = t_vals[-1]
+    jumpers = JumperBatch(jumper.drag_coeff, y_0, jumper.mass)
+    duration, max_speed, max_mach = calculate_numerical_batch(
+        jumpers, global_vars, False
+    )
     plot_jump_height(y_0, max_mach, max_speed, duration)
 
 
@@ -383,57 +615,40 @@ def vary_drag_coeff(jumper: Jumper, global_vars: dict):
 
     """
     drag_coeff = np.linspace(0.05, 2.0, 300)
-    max_mach = np.full_like(drag_coeff, 0)
-    max_speed = np.full_like(drag_coeff, 0)
-    duration = np.full_like(drag_coeff, 0)
-    for idx, val in enumerate(drag_coeff):
-        jumper.drag_coeff = val
-        t_vals, y_vals, vy_vals = fill_dataset_jumper_num(
-            jumper, global_vars, False, False, False
-        )
-        mach_ratio, vy_vals_abs = calculate_mach_ratios(y_vals, vy_vals, global_vars)
-        max_speed[idx] = np.max(vy_vals_abs)
-        max_mach[idx] = np.max(mach_ratio)
-        duration[idx] = t_vals[-1]
+    jumpers = JumperBatch(drag_coeff, jumper.starting_height, jumper.mass)
+    duration, max_speed, max_mach = calculate_numerical_batch(
+        jumpers, global_vars, False
+    )
     plot_drag_coeff(drag_coeff, max_mach, max_speed, duration)
 
 
 def calculate_sound_values(y_vals: np.ndarray, global_vars: dict) -> np.ndarray:
-    """Populate vsound array at each height in the altitude array, with an
-    intermediate temperature array which is populated using
-    numpy.select() to apply the inequalities provided.
+    """Populate vsound array at each height in the altitude array, from the
+    tables of the Atmosphere for global_vars
 
     :param vy_vals: vy array
     :param y_vals: y varray
     :returns: vsound array
 
     """
-    temp_conditions = [
-        y_vals <= sys.float_info.epsilon + 11000,
-        (11000 - sys.float_info.epsilon < y_vals)
-        & (y_vals <= sys.float_info.epsilon + 25100),
-    ]
-    temp_choices = [288.0 - 0.0065 * y_vals, 216.5]
-    temp_vals = np.select(temp_conditions, temp_choices, 141.3 + 0.003 * y_vals)
-    return np.sqrt(
-        global_vars["gamma"]
-        * global_vars["molar_gas_constant"]
-        * temp_vals
-        / global_vars["molar_gas_mass"]
-    )
+    return get_atmosphere(global_vars).sound_speed(y_vals)
 
 
-def calculate_drag_factor(y_val: float, jumper: Jumper, global_vars: dict) -> float:
+def calculate_drag_factor(
+    y_val: float, jumper: Jumper, global_vars: dict, atmosphere: Atmosphere = None
+) -> float:
     """Evaluates the drag factor by altitude.
 
     :param y_val: height
     :param jumper: from Jumper class
     :param global_vars: global variables
+    :param atmosphere: the Atmosphere for global_vars, to save looking it up
     :returns: drag factor (float)
 
     """
-    rho = global_vars["rho_0"] * np.exp((-y_val) / global_vars["scale_height"])
-    return jumper.drag_coeff * rho * jumper.cross_sec_area / 2
+    if atmosphere is None:
+        atmosphere = get_atmosphere(global_vars)
+    return jumper.drag_coeff * atmosphere.density(y_val) * jumper.cross_sec_area / 2
 
 
 def calculate_analytical_predictions(
@@ -473,7 +688,10 @@ def calculate_analytical_predictions(
 def calculate_numerical_predictions(
     jumper: Jumper, global_vars: dict, is_constant_drag: bool, is_verbose: bool
 ) -> tuple:
-    """Populate t, v, and y arrays given numerical equations.
+    """Populate t, v, and y arrays given numerical equations, stepping until
+    the body hits the ground. The last point is where y crosses 0, found by
+    interpolating between the steps either side. The arrays start with
+    space for global_vars["points"] steps and grow if the fall is longer.
 
     :param t_vals: time array
     :param y_vals: y array
@@ -481,30 +699,268 @@ def calculate_numerical_predictions(
     :returns: tuple of results after evaluation (t, y, v)
 
     """
-    t_vals = np.arange(0, global_vars["points"]) * global_vars["timestep"]
-    y_vals, vy_vals = (
+    timestep = global_vars["timestep"]
+    t_vals, y_vals, vy_vals = (
+        np.zeros(global_vars["points"]),
         np.zeros(global_vars["points"]),
         np.zeros(global_vars["points"]),
     )
     drag_factor = jumper.drag_coeff * global_vars["rho_0"] * jumper.cross_sec_area / 2
     if is_verbose:
-        print_header_1(
-            jumper, drag_factor, global_vars["timestep"], is_constant_drag, "numerical"
-        )
+        print_header_1(jumper, drag_factor, timestep, is_constant_drag, "numerical")
     y_vals[0] = jumper.starting_height
-    for idx, _ in enumerate(t_vals[:-1]):
+    atmosphere = get_atmosphere(global_vars)
+    grav = global_vars["grav"]
+    # step with plain floats, which are much faster than numpy scalars one
+    # at a time, and only store each step in the arrays
+    y_val, vy_val = float(y_vals[0]), 0.0
+    idx = 0
+    while y_val >= sys.float_info.epsilon:
+        if idx + 1 == np.size(t_vals):
+            t_vals, y_vals, vy_vals = (
+                np.concatenate((vals, np.zeros_like(vals)))
+                for vals in (t_vals, y_vals, vy_vals)
+            )
         if not is_constant_drag:
             drag_factor = calculate_drag_factor(
-                y_vals[idx],
+                y_val,
                 jumper,
                 global_vars,
+                atmosphere,
             )
-        vy_vals[idx + 1] = vy_vals[idx] - global_vars["timestep"] * (
-            global_vars["grav"]
-            + ((drag_factor / jumper.mass) * np.abs(vy_vals[idx]) * vy_vals[idx])
+        y_val, vy_val = y_val + timestep * vy_val, vy_val - timestep * (
+            grav + ((drag_factor / jumper.mass) * abs(vy_val) * vy_val)
         )
-        y_vals[idx + 1] = y_vals[idx] + global_vars["timestep"] * vy_vals[idx]
-    return t_vals, y_vals, vy_vals
+        idx += 1
+        t_vals[idx], y_vals[idx], vy_vals[idx] = idx * timestep, y_val, vy_val
+    if idx > 0:
+        # move the first step below ground back to where it crossed y = 0
+        fraction = y_vals[idx - 1] / (y_vals[idx - 1] - y_vals[idx])
+        t_vals[idx] = t_vals[idx - 1] + fraction * timestep
+        vy_vals[idx] = vy_vals[idx - 1] + fraction * (vy_vals[idx] - vy_vals[idx - 1])
+        y_vals[idx] = 0.0
+    return t_vals[: idx + 1], y_vals[: idx + 1], vy_vals[: idx + 1]
+
+
+def calculate_numerical_batch(
+    jumpers: JumperBatch, global_vars: dict, is_constant_drag: bool
+) -> tuple:
+    """Step every jumper in a batch at once with the same method as
+    calculate_numerical_predictions(), dropping each one when it hits the
+    ground, and keep track of what fill_dataset_jumper_num() followed by
+    calculate_mach_ratios() would give
+
+    :param jumpers: from JumperBatch class
+    :param global_vars: global variables
+    :param is_constant_drag: toggles drag varying
+    :returns: tuple of arrays (duration, max speed, max Mach number), one
+        value per jumper
+
+    """
+    timestep = global_vars["timestep"]
+    duration = np.zeros_like(jumpers.mass)
+    max_speed = np.zeros_like(jumpers.mass)
+    max_mach = np.zeros_like(jumpers.mass)
+    # the jumpers still falling, and where they are in the results
+    falling = jumpers
+    members = np.arange(jumpers.mass.size)
+    y_vals = falling.starting_height.copy()
+    vy_vals = np.zeros_like(y_vals)
+    # the largest speed and Mach number so far of each jumper still falling,
+    # only written into the results when it lands
+    speed_peak = np.zeros_like(y_vals)
+    mach_peak = np.zeros_like(y_vals)
+    drag_factor = falling.drag_coeff * global_vars["rho_0"] * falling.cross_sec_area / 2
+    idx = 0
+    while members.size > 0:
+        is_landed = y_vals < sys.float_info.epsilon
+        if np.any(is_landed):
+            if idx > 0:
+                # the landing point, as in calculate_numerical_predictions()
+                landed = members[is_landed]
+                y_before, vy_before = y_prev[is_landed], vy_prev[is_landed]
+                fraction = y_before / (y_before - y_vals[is_landed])
+                vy_landed = np.abs(
+                    vy_before + fraction * (vy_vals[is_landed] - vy_before)
+                )
+                duration[landed] = (idx - 1) * timestep + fraction * timestep
+                max_speed[landed] = np.maximum(speed_peak[is_landed], vy_landed)
+                max_mach[landed] = np.maximum(
+                    mach_peak[is_landed],
+                    vy_landed
+                    / calculate_sound_values(np.zeros_like(vy_landed), global_vars),
+                )
+            is_falling = ~is_landed
+            falling = falling.select(is_falling)
+            members = members[is_falling]
+            y_vals, vy_vals = y_vals[is_falling], vy_vals[is_falling]
+            speed_peak, mach_peak = speed_peak[is_falling], mach_peak[is_falling]
+            drag_factor = drag_factor[is_falling]
+            if members.size == 0:
+                break
+        vy_vals_abs = np.abs(vy_vals)
+        np.maximum(speed_peak, vy_vals_abs, out=speed_peak)
+        np.maximum(
+            mach_peak,
+            vy_vals_abs / calculate_sound_values(y_vals, global_vars),
+            out=mach_peak,
+        )
+        if not is_constant_drag:
+            drag_factor = calculate_drag_factor(y_vals, falling, global_vars)
+        y_prev, vy_prev = y_vals, vy_vals
+        y_vals, vy_vals = y_vals + timestep * vy_vals, vy_vals - timestep * (
+            global_vars["grav"] + (drag_factor / falling.mass) * vy_vals_abs * vy_vals
+        )
+        idx += 1
+    return duration, max_speed, max_mach
+
+
+def calculate_adaptive_predictions(
+    jumper: Jumper,
+    global_vars: dict,
+    is_constant_drag: bool,
+    tolerance: float,
+) -> tuple:
+    """Populate t, v, and y arrays with the Dormand-Prince (RK45) method,
+    changing the timestep to keep the estimated error of each step below
+    tolerance, and stopping where the body hits the ground. The last point is
+    where y crosses 0, found from the dense output of the last step.
+
+    :param jumper: from Jumper class
+    :param global_vars: global variables
+    :param is_constant_drag: toggles drag varying
+    :param tolerance: the largest error allowed in each step, relative to
+        the size of y and v, plus the same as an absolute error
+    :returns: tuple of arrays at the accepted steps (t, y, v)
+
+    """
+    state = np.array([jumper.starting_height, 0.0])
+    slope = calculate_freefall_slope(state, jumper, global_vars, is_constant_drag)
+    t_vals, states, slopes = [0.0], [state], [slope]
+    timestep = global_vars["timestep"]
+    while state[0] >= sys.float_info.epsilon:
+        state_next, stages, error = take_dormand_prince_step(
+            state, slope, timestep, jumper, global_vars, is_constant_drag
+        )
+        scale = tolerance * (1 + np.maximum(np.abs(state), np.abs(state_next)))
+        error_ratio = np.max(np.abs(error) / scale)
+        if error_ratio <= 1:
+            t_vals.append(t_vals[-1] + timestep)
+            state, slope = state_next, stages[-1]
+            states.append(state)
+            slopes.append(slope)
+        timestep *= min(5.0, max(0.2, 0.9 * max(error_ratio, 1e-10) ** -0.2))
+    t_vals, states, slopes = np.array(t_vals), np.array(states), np.array(slopes)
+    if np.size(t_vals) > 1:
+        # find where y crosses 0 in the last step by bisection
+        start, stop = t_vals[-2], t_vals[-1]
+        for _ in range(60):
+            middle = (start + stop) / 2
+            height = evaluate_dense_output(t_vals, states, slopes, np.array([middle]))
+            if height[0, 0] >= 0:
+                start = middle
+            else:
+                stop = middle
+        # one more step from the last point above ground to the landing
+        states[-1] = take_dormand_prince_step(
+            states[-2],
+            slopes[-2],
+            stop - t_vals[-2],
+            jumper,
+            global_vars,
+            is_constant_drag,
+        )[0]
+        t_vals[-1] = stop
+        states[-1, 0] = 0.0
+    return t_vals, states[:, 0], states[:, 1]
+
+
+def take_dormand_prince_step(
+    state: np.ndarray,
+    slope: np.ndarray,
+    timestep: float,
+    jumper: Jumper,
+    global_vars: dict,
+    is_constant_drag: bool,
+) -> tuple:
+    """Take one step of the Dormand-Prince method
+
+    :param state: array of (y, v) at the start of the step
+    :param slope: the derivative of (y, v) at the start of the step
+    :param timestep: the length of the step
+    :param jumper: from Jumper class
+    :param global_vars: global variables
+    :param is_constant_drag: toggles drag varying
+    :returns: tuple of (y, v) at the end of the step, the derivative at each
+        stage, the last of which is at the end of the step, and the estimated
+        error of (y, v)
+
+    """
+    stages = [slope]
+    for row in DORMAND_PRINCE_STAGES:
+        stages.append(
+            calculate_freefall_slope(
+                state + timestep * np.dot(row, stages[: len(row)]),
+                jumper,
+                global_vars,
+                is_constant_drag,
+            )
+        )
+    # the last stage is at the end of the step, with the 5th order answer
+    state_next = state + timestep * np.dot(DORMAND_PRINCE_STAGES[-1], stages[:6])
+    return state_next, stages, timestep * np.dot(DORMAND_PRINCE_ERROR, stages)
+
+
+def calculate_freefall_slope(
+    state: np.ndarray, jumper: Jumper, global_vars: dict, is_constant_drag: bool
+) -> np.ndarray:
+    """Evaluate the derivative of (y, v) for freefall with drag
+
+    :param state: array of (y, v)
+    :param jumper: from Jumper class
+    :param global_vars: global variables
+    :param is_constant_drag: toggles drag varying
+    :returns: array of (v, acceleration)
+
+    """
+    if is_constant_drag:
+        drag_factor = (
+            jumper.drag_coeff * global_vars["rho_0"] * jumper.cross_sec_area / 2
+        )
+    else:
+        drag_factor = calculate_drag_factor(state[0], jumper, global_vars)
+    return np.array(
+        [
+            state[1],
+            -global_vars["grav"]
+            - (drag_factor / jumper.mass) * np.abs(state[1]) * state[1],
+        ]
+    )
+
+
+def evaluate_dense_output(
+    t_vals: np.ndarray, states: np.ndarray, slopes: np.ndarray, times: np.ndarray
+) -> np.ndarray:
+    """Evaluate (y, v) between the steps of calculate_adaptive_predictions(),
+    with the cubic Hermite interpolant through the values and derivatives at
+    each end of the step
+
+    :param t_vals: time of each step
+    :param states: array of (y, v) at each step
+    :param slopes: array of the derivative of (y, v) at each step
+    :param times: the times to evaluate at, between t_vals[0] and t_vals[-1]
+    :returns: array of (y, v) at each time
+
+    """
+    step = np.clip(np.searchsorted(t_vals, times) - 1, 0, np.size(t_vals) - 2)
+    width = (t_vals[step + 1] - t_vals[step])[:, np.newaxis]
+    fraction = (times - t_vals[step])[:, np.newaxis] / width
+    return (
+        (1 + 2 * fraction) * (1 - fraction) ** 2 * states[step]
+        + fraction * (1 - fraction) ** 2 * width * slopes[step]
+        + fraction**2 * (3 - 2 * fraction) * states[step + 1]
+        + fraction**2 * (fraction - 1) * width * slopes[step + 1]
+    )
 
 
 ##############################
@@ -512,14 +968,78 @@ def calculate_numerical_predictions(
 ##############################
 
 
-def fill_dataset_wave(global_vars: dict, wavepacket: StringWave) -> tuple:
+def fill_dataset_wave(
+    global_vars: dict, wavepacket: StringWave, dataset: np.ndarray = None
+) -> tuple:
     """Initialises solution array dataset, retrieve solutions for initial
     timesteps, retrieve solutions for the other timesteps.
 
     :param global_vars: global variables
     :param wavepacket: from StringWave class
+    :param dataset: array of shape (t, x) to fill, e.g. a numpy.memmap, or
+        None for a new array
     :returns: tuple of arrays (dataset, x, t)
 
+    """
+    _, x_vals, t_vals = get_wave_grid(global_vars, wavepacket)
+    if dataset is None:
+        dataset = np.zeros((np.size(t_vals), np.size(x_vals)), dtype="float64")
+    for time_idx, solution in stream_wave(global_vars, wavepacket):
+        dataset[time_idx] = solution
+    return dataset, x_vals, t_vals
+
+
+def stream_wave(global_vars: dict, wavepacket: StringWave, every: int = 1):
+    """Solve the wave one timestep at a time, keeping only the last three
+    timesteps, so memory does not grow with the simulated time
+
+    :param global_vars: global variables
+    :param wavepacket: from StringWave class
+    :param every: only give every this many timesteps
+    :returns: generator of (time index, solution at that time), where the
+        solution array is reused for later timesteps, so copy it to keep it
+
+    """
+    gamma, x_vals, t_vals = get_wave_grid(global_vars, wavepacket)
+    # timestep i is kept in row i % 3, which calculate_next_timestep() reads
+    # with negative indices for the two timesteps before
+    rolling = np.zeros((3, np.size(x_vals)), dtype="float64")
+    rolling = calculate_initial_timestep(
+        global_vars, wavepacket, x_vals, t_vals, rolling
+    )
+    for time_idx in range(min(2, np.size(t_vals))):
+        if time_idx % every == 0:
+            yield time_idx, rolling[time_idx]
+    for time_idx in range(2, np.size(t_vals)):
+        row = time_idx % 3
+        rolling[row] = 0.0
+        rolling[row] = calculate_next_timestep(
+            (row, gamma), global_vars, wavepacket, rolling, x_vals
+        )
+        if time_idx % every == 0:
+            yield time_idx, rolling[row]
+
+
+def write_wave(global_vars: dict, wavepacket: StringWave, writer, every: int = 1):
+    """Solve the wave with stream_wave() and hand each timestep to a writer
+
+    :param global_vars: global variables
+    :param wavepacket: from StringWave class
+    :param writer: called as writer(time index, solution) for each timestep
+    :param every: only write every this many timesteps
+
+    """
+    for time_idx, solution in stream_wave(global_vars, wavepacket, every):
+        writer(time_idx, solution)
+
+
+def get_wave_grid(global_vars: dict, wavepacket: StringWave) -> tuple:
+    """Find gamma and the positions and times the wave is solved at
+
+    :param global_vars: global variables
+    :param wavepacket: from StringWave class
+    :returns: tuple of (gamma, x array, t array)
+
     """
     gamma = (
         global_vars["timestep2"]
@@ -536,17 +1056,7 @@ def fill_dataset_wave(global_vars: dict, wavepacket: StringWave) -> tuple:
         global_vars["T"] + global_vars["timestep2"],
         global_vars["timestep2"],
     )
-    dataset = np.zeros((np.size(t_vals), np.size(x_vals)), dtype="float64")
-    dataset = calculate_initial_timestep(
-        global_vars, wavepacket, x_vals, t_vals, dataset
-    )
-    for time in t_vals[2:]:
-        time_idx = map_float_to_index(time, global_vars["timestep2"], t_vals[0])
-        dataset[time_idx] = calculate_next_timestep(
-            (time_idx, gamma), global_vars, wavepacket, dataset, x_vals
-        )
-
-    return dataset, x_vals, t_vals
+    return gamma, x_vals, t_vals
 
 
 def calculate_initial_timestep(
@@ -709,6 +1219,62 @@ def print_header_1(
         )
 
 
+def get_atmosphere(global_vars: dict) -> Atmosphere:
+    """Get the Atmosphere for the global variables, where
+    global_vars["atmosphere"] picks the profile, "exponential" if not given
+
+    :param global_vars: global variables
+    :returns: the Atmosphere, made only once for each set of values
+
+    """
+    return load_atmosphere(
+        global_vars.get("atmosphere", "exponential"),
+        (
+            global_vars["rho_0"],
+            global_vars["scale_height"],
+            global_vars["gamma"],
+            global_vars["molar_gas_constant"],
+            global_vars["molar_gas_mass"],
+            global_vars["grav"],
+        ),
+    )
+
+
+@lru_cache(maxsize=None)
+def load_atmosphere(profile: str, constants: tuple) -> Atmosphere:
+    """Make an Atmosphere, kept for the next call with the same values
+
+    :param profile: as in Atmosphere
+    :param constants: as in Atmosphere
+    :returns: the Atmosphere
+
+    """
+    return Atmosphere(profile, constants)
+
+
+def calculate_layer_pressure(
+    base_pressure, base_temp, lapse_rate, height, grav_factor: float
+):
+    """Evaluate the pressure at a height above the base of an atmosphere layer
+    with a fixed rate of temperature change
+
+    :param base_pressure: pressure at the base of the layer
+    :param base_temp: temperature at the base of the layer
+    :param lapse_rate: rate of temperature change with height
+    :param height: height above the base of the layer
+    :param grav_factor: grav * molar_gas_mass / molar_gas_constant
+    :returns: pressure
+
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(
+            lapse_rate == 0,
+            base_pressure * np.exp(-grav_factor * height / base_temp),
+            base_pressure
+            * (1 + lapse_rate * height / base_temp) ** (-grav_factor / lapse_rate),
+        )
+
+
 def round_with_decimal(decimal_places: int, value: float) -> float:
     """Round a float to the nearest dp provided without precision error
     using quantize() from Decimal class
@@ -722,17 +1288,6 @@ def round_with_decimal(decimal_places: int, value: float) -> float:
     return float(Decimal(str(value)).quantize(Decimal(reference)))
 
 
-def map_float_to_index(value: float, step: float, start: float) -> int:
-    """Given the value convert it to an index
-
-    :param value: the original value
-    :param step: the stepsize
-    :param returns: the index
-
-    """
-    return int(round_with_decimal(0, (value - start) / step))
-
-
 def print_header_2(wavepacket: StringWave, global_vars: dict):
     """Print some verbose information for problem 2
 
@@ -998,6 +1553,7 @@ def main():
         "timestep2": 0.05,
         "T": 6.5,
         "tolerance": 1e-14,
+        "atmosphere": "exponential",
     }
     default_jumper = Jumper(1.0, 1000, 70)
     baumgartner = Jumper(1.0, 39045, 70)
@@ -1021,6 +1577,8 @@ def main():
             run_option_e(global_vars, default_wave)
         elif user_input == "f":
             run_option_f(global_vars, default_wave)
+        elif user_input == "g":
+            run_option_g(baumgartner, global_vars)
         elif user_input != "q":
             print("This is not a valid choice.")
     print("You have chosen to finish - goodbye.")